@@ -0,0 +1,54 @@
+import os
+import sys
+import streamlit as st
+
+# Streamlit puts this script's directory on sys.path, the project root is needed for the app package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.config as config
+from app.utils.app_generator import AppGenerator
+from app.utils.app_specs import load_app_spec
+from app.utils.logger import setup_logger
+
+logger = setup_logger("AppHost")
+
+
+@st.cache_resource(show_spinner=False)
+def get_renderer():
+    config.set_paths(os.path.dirname(os.path.abspath(__file__)))
+    config.setup()
+    # Hosted apps share one process, so they never get the debug profile's per-app file copies
+    return AppGenerator(profile="production")
+
+
+@st.cache_resource(show_spinner=False)
+def get_app_code(app_id):
+    """Render and compile a hosted app once, every later session reuses the code object"""
+    renderer = get_renderer()
+    spec = load_app_spec(app_id)
+    if spec is None:
+        # Raised rather than returned, so the miss is not cached and a spec saved later is served
+        raise ValueError(f"No app spec saved for {app_id}")
+    source = renderer.build_app_source(spec["services"], spec["parameters"], hosted=True)
+    logger.info(f"Compiled hosted app {app_id} with services: {spec['services']}")
+    return compile(source, f"<app {app_id}>", "exec")
+
+
+def run_app_host():
+    app_id = st.query_params.get("app_id")
+    try:
+        code = get_app_code(app_id) if app_id else None
+    except ValueError as e:
+        logger.error(f"Could not load app {app_id}: {str(e)}")
+        code = None
+
+    if code is None:
+        st.set_page_config(page_title=config.APP_NAME, page_icon="🏫")
+        st.error(f"No {config.APP_NAME} app found for id: {app_id}")
+        return
+
+    # Each app runs in its own namespace so module-level names never leak between tenants
+    exec(code, {"__name__": f"app_{app_id}", "__file__": os.path.abspath(__file__)})
+
+
+run_app_host()
@@ -4,7 +4,9 @@ from app.utils.app_generator import AppGenerator
 import app.config as config
 from app.utils.logger import setup_logger
 from app.utils.chatbot import chatbot_conversation, initialize_conversation
-from app.utils.feedback_collector import FeedbackCollector
+from app.utils.feedback_collector import get_feedback_collector
+from app.utils.generation_jobs import get_generation_queue
+from app.utils.service_prewarm import get_service_prewarmer
 
 
 class BuilderApp:
@@ -19,7 +21,8 @@ class BuilderApp:
             )
         self.all_services = self._discover_services(config.MICROSERVICES_DIR)
         self.app_generator = AppGenerator()
-        self.feedback_collector = FeedbackCollector()
+        self.generation_queue = get_generation_queue()
+        self.feedback_collector = get_feedback_collector()
 
     def _discover_services(self, directory):
         services = []
@@ -131,6 +134,12 @@ class BuilderApp:
                 response, st.session_state.conversation_state = chatbot_conversation(user_input, st.session_state.conversation_state)
                 st.write(response)
             st.session_state.conversation_history.append({"role": "assistant", "content": response})
+            # Start and warm the services this session will likely need while the user keeps chatting
+            get_service_prewarmer().observe(
+                st.session_state.conversation_history,
+                st.session_state.conversation_state.get("suggested_services", []),
+                st.session_state.conversation_state.get("parameters", {})
+            )
 
         # Check if ready to create app
         if st.session_state.conversation_state.get("ready_for_app", False):
@@ -151,14 +160,38 @@ class BuilderApp:
             # Show create app button after feedback or in dev mode
             if st.session_state.feedback_submitted or dev_mode:
                 if st.button(f"Create {config.APP_NAME} App"):
-                    app_url = self.app_generator.generate_app(
+                    # Generation runs on a background worker, the session only keeps the job id to poll
+                    st.session_state.generation_job = self.generation_queue.submit(
+                        self.app_generator,
                         selected_services,
                         st.session_state.conversation_state["parameters"]
                     )
-                    st.success(f"Your personalized {config.APP_NAME} app has been created! Access it at: {app_url}")
                     st.session_state.conversation_state = initialize_conversation()
                     st.session_state.conversation_history = []
                     st.session_state.feedback_submitted = False
+                    st.rerun()
+
+        if st.session_state.get("generation_job"):
+            self.show_generation_job()
+
+    def show_generation_job(self):
+        job = self.generation_queue.get_job(st.session_state.generation_job)
+        if job is None:
+            return
+        if job["status"] == "done":
+            st.success(f"Your personalized {config.APP_NAME} app has been created! Access it at: {job['app_url']}")
+        elif job["status"] == "failed":
+            st.error(f"Could not create your {config.APP_NAME} app: {job['error']}")
+        else:
+            self.poll_generation_job()
+
+    @st.fragment(run_every=1)
+    def poll_generation_job(self):
+        """Refreshes only this block every second until the job finishes"""
+        job = self.generation_queue.get_job(st.session_state.generation_job)
+        if job is None or job["status"] in ("done", "failed"):
+            st.rerun()
+        st.info(f"Creating your {config.APP_NAME} app ({job['status']})...")
 
 
 if __name__ == "__main__":
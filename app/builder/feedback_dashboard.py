@@ -0,0 +1,28 @@
+import streamlit as st
+import pandas as pd
+from app.utils.feedback_collector import get_feedback_collector
+
+def render_feedback_dashboard():
+    """Render feedback statistics from the precomputed rollups"""
+    st.markdown("### Feedback")
+    collector = get_feedback_collector()
+    stats = collector.get_feedback_stats()
+    if not stats or not stats["total_responses"]:
+        st.info("No feedback collected yet")
+        return
+
+    cols = st.columns(4)
+    cols[0].metric("Responses", stats["total_responses"])
+    cols[1].metric("Avg accuracy", f"{stats['average_accuracy']:.2f}" if stats["average_accuracy"] is not None else "-")
+    cols[2].metric("Avg relevance", f"{stats['average_relevance']:.2f}" if stats["average_relevance"] is not None else "-")
+    cols[3].metric("Would use again", f"{stats['would_use_again_percentage']:.0f}%")
+
+    st.caption(f"Most often missing: {', '.join(stats['most_common_missing_services']) or '-'}")
+    st.caption(f"Most often unnecessary: {', '.join(stats['most_common_unnecessary_services']) or '-'}")
+
+    period = st.radio("Period", ["daily", "weekly"], horizontal=True, key="feedback_period")
+    series = collector.get_feedback_timeseries(period, last=30)
+    if series:
+        df = pd.DataFrame(series).set_index("bucket")
+        st.bar_chart(df["total_responses"])
+        st.line_chart(df[["average_accuracy", "average_relevance"]])
@@ -103,6 +103,15 @@ def render_service_card(service_name: str, status: dict, manager: ServiceManager
         
         with control_col:
             if status["status"] == "running":
+                if len(versions) > 1 and st.button("Switch", key=f"switch_{service_name}",
+                                                   help="Serve the selected version, in place when hot reload is enabled"):
+                    with st.spinner(f"Switching {service_name} to {version} version..."):
+                        result = manager.switch_version(service_name, version)
+                        if result["success"]:
+                            st.success(result["message"])
+                        else:
+                            st.error(result["message"])
+                        st.rerun()
                 if st.button("Stop", key=f"stop_{service_name}"):
                     with st.spinner(f"Stopping {service_name}..."):
                         result = manager.stop_service(service_name)
@@ -1,22 +1,39 @@
 import os
-from typing import Optional
+from typing import Dict, Optional
 
 APP_NAME: str = "City Companion"
 BUILDER_PORT: int = 8501
+APP_HOST_PORT: int = 8502
 MIN_PORT: int = 9000
 MAX_PORT: int = 9999
 
+# How long (seconds) generated apps may reuse a service response, matched to how often its data changes
+DEFAULT_SERVICE_CACHE_TTL: int = 600
+SERVICE_CACHE_TTLS: Dict[str, int] = {
+    "historical_info": 24 * 60 * 60,
+    "restaurant_finder": 60 * 60,
+    "travel_options": 60 * 60,
+    "exhibition_tracker": 60 * 60,
+    "event_notifier": 30 * 60,
+    "ticket_purchase": 10 * 60,
+    "air_quality": 5 * 60,
+    "water_quality": 5 * 60,
+    "crowd_monitor": 60,
+}
+
 # These paths will be set dynamically when the config is loaded
 APP_DIR: Optional[str] = None
 MICROSERVICES_DIR: Optional[str] = None
 GENERATED_APPS_DIR: Optional[str] = None
+APP_SPECS_DIR: Optional[str] = None
 
 
 def set_paths(base_path: str) -> None:
-    global APP_DIR, MICROSERVICES_DIR, GENERATED_APPS_DIR
+    global APP_DIR, MICROSERVICES_DIR, GENERATED_APPS_DIR, APP_SPECS_DIR
     APP_DIR = base_path
     MICROSERVICES_DIR = os.path.join(base_path, "microservices")
     GENERATED_APPS_DIR = os.path.join(base_path, "generated_apps")
+    APP_SPECS_DIR = os.path.join(GENERATED_APPS_DIR, "specs")
 
 
 def setup():
@@ -0,0 +1,170 @@
+import asyncio
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import time
+from collections import OrderedDict
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+from app.microservices.base import MicroserviceBase
+from app.utils.port_manager import get_port_manager
+import app.config as config
+
+class ServiceCall(BaseModel):
+    name: str
+    # JSON body, usually an object but some services take a list or no body at all
+    params: Any = {}
+    # Route and query parameters, POST /{name} without a query by default
+    path: Optional[str] = None
+    query: Dict[str, Any] = {}
+    timeout: Optional[float] = None
+
+class AggregateParams(BaseModel):
+    services: List[ServiceCall]
+    timeout: Optional[float] = None
+
+class AggregatorService(MicroserviceBase):
+    def __init__(self):
+        super().__init__("aggregator")
+        self.update_service_info(
+            description="Queries several services in parallel and returns their results in one response",
+            dependencies=[]
+        )
+        self.port_manager = get_port_manager()
+        self.default_timeout = float(os.getenv("AGGREGATOR_TIMEOUT", "5"))
+        self.max_connections = int(os.getenv("AGGREGATOR_MAX_CONNECTIONS", "64"))
+        # With AGGREGATOR_IN_PROCESS=true the backend services are loaded into this process and called without a socket
+        self.in_process = os.getenv("AGGREGATOR_IN_PROCESS", "false").lower() == "true"
+        self.client = None
+        self.local_clients = {}
+        self.local_clients_lock = asyncio.Lock()
+        # spec hash -> (expires_at, response) in least recently used order, only fully successful responses are cached
+        self.response_cache = OrderedDict()
+        self.cache_size = int(os.getenv("AGGREGATOR_CACHE_SIZE", "1024"))
+
+    def register_routes(self):
+        @self.app.on_event("startup")
+        async def open_client():
+            import httpx
+
+            self.client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+
+        @self.app.on_event("shutdown")
+        async def close_clients():
+            for client in [self.client, *self.local_clients.values()]:
+                if client is not None:
+                    await client.aclose()
+
+        @self.app.post("/aggregator")
+        async def aggregate(params: AggregateParams):
+            self.logger.info(f"Received parameters: {params}")
+            return await self.process_request(params.dict())
+
+    def _load_local_service(self, service_name: str) -> MicroserviceBase:
+        module = importlib.import_module(f"app.microservices.{service_name}.service")
+        service_class = next(
+            obj for _, obj in inspect.getmembers(module, inspect.isclass)
+            if issubclass(obj, MicroserviceBase) and obj is not MicroserviceBase
+        )
+        service = service_class()
+        service.register_routes()
+        return service
+
+    async def _local_client(self, service_name: str):
+        """ASGI client for a service loaded into this process, so requests still go through its validation"""
+        if service_name not in self.local_clients:
+            async with self.local_clients_lock:
+                # Another request may have loaded it while this one waited for the lock
+                if service_name not in self.local_clients:
+                    import httpx
+
+                    # Importing and building a service reads its data, keep that off the event loop
+                    service = await asyncio.to_thread(self._load_local_service, service_name)
+                    self.local_clients[service_name] = httpx.AsyncClient(
+                        transport=httpx.ASGITransport(app=service.app), base_url="http://local"
+                    )
+                    self.logger.info(f"Loaded {service_name} in process")
+        return self.local_clients[service_name]
+
+    async def _post(self, call: Dict[str, Any]) -> Any:
+        service_name = call["name"]
+        path = call.get("path") or f"/{service_name}"
+        if self.in_process:
+            client = await self._local_client(service_name)
+            response = await client.post(path, json=call["params"], params=call.get("query"))
+        else:
+            port = self.port_manager.get_service_info(service_name).get("port")
+            if port is None:
+                raise ValueError(f"Service info not found for {service_name} service")
+            response = await self.client.post(
+                f"http://localhost:{port}{path}", json=call["params"], params=call.get("query")
+            )
+        response.raise_for_status()
+        return response.json()
+
+    async def _call_service(self, call: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            data = await asyncio.wait_for(self._post(call), timeout=call["timeout"] or timeout)
+            result = {"status": "ok", "data": data}
+        except asyncio.TimeoutError:
+            result = {"status": "error", "error": f"Timed out after {call['timeout'] or timeout}s"}
+        except Exception as e:
+            self.logger.error(f"Error calling {call['name']}: {str(e)}")
+            result = {"status": "error", "error": f"{type(e).__name__}: {str(e)}"}
+        result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return result
+
+    def _cache_ttl(self, calls: List[Dict[str, Any]]) -> int:
+        # The combined response is only as fresh as its most volatile service
+        return min(config.SERVICE_CACHE_TTLS.get(call["name"], config.DEFAULT_SERVICE_CACHE_TTL) for call in calls)
+
+    async def process_request(self, params):
+        calls = params["services"]
+        if not calls:
+            return {"results": {}, "errors": {}, "timings": {}, "cached": False, "elapsed_ms": 0.0}
+
+        key = hashlib.sha256(json.dumps(calls, sort_keys=True).encode("utf-8")).hexdigest()
+        cached = self.response_cache.get(key)
+        if cached:
+            if cached[0] > time.time():
+                self.response_cache.move_to_end(key)
+                return {**cached[1], "cached": True}
+            del self.response_cache[key]
+
+        start = time.perf_counter()
+        timeout = params.get("timeout") or self.default_timeout
+        outcomes = await asyncio.gather(*(self._call_service(call, timeout) for call in calls))
+
+        response = {"results": {}, "errors": {}, "timings": {}, "cached": False}
+        for call, outcome in zip(calls, outcomes):
+            response["timings"][call["name"]] = outcome["elapsed_ms"]
+            if outcome["status"] == "ok":
+                response["results"][call["name"]] = outcome["data"]
+            else:
+                response["errors"][call["name"]] = outcome["error"]
+        response["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        self.logger.info(
+            f"Aggregated {len(response['results'])}/{len(calls)} services in {response['elapsed_ms']}ms"
+        )
+
+        if not response["errors"]:
+            self.response_cache[key] = (time.time() + self._cache_ttl(calls), response)
+            self.response_cache.move_to_end(key)
+            while len(self.response_cache) > self.cache_size:
+                self.response_cache.popitem(last=False)
+        return response
+
+def start_aggregator_service():
+    service = AggregatorService()
+    service.run()
+
+if __name__ == "__main__":
+    start_aggregator_service()
@@ -3,15 +3,16 @@ from pydantic import BaseModel
 from typing import List, Dict, Optional, Tuple
 from app.microservices.base import MicroserviceBase
 from app.utils.llm_utils import load_microservices, load_summary, load_service_parameters
-from langchain_openai import ChatOpenAI
-from langchain_community.llms import Ollama
-from langchain.schema import HumanMessage, SystemMessage, AIMessage
-from langchain.prompts import PromptTemplate
+from app.utils.history_manager import ConversationHistoryManager
+from app.utils.llm_gateway import LLMGateway, LLMProviderError
+from app.utils.structured_extraction import (
+    build_extraction_schema,
+    build_repair_prompt,
+    parse_json_response,
+    validate_extraction
+)
+import asyncio
 import os
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv(override=True)
 
 class ChatInput(BaseModel):
     user_input: str
@@ -34,39 +35,12 @@ class ChatbotLLMService(MicroserviceBase):
         self.logger.info(f"OPENAI_API_KEY: {'Set' if os.getenv('OPENAI_API_KEY') else 'Not Set'}")
         self.logger.info(f"OPENAI_MODEL: {os.getenv('OPENAI_MODEL')}")
 
-        # Initialize LLM based on provider
-        if self.llm_provider == "openai":
-            api_key = os.getenv("OPENAI_API_KEY")
-            if not api_key:
-                self.logger.error("OpenAI API key not found in environment variables")
-                raise ValueError("OpenAI API key not found")
-            
-            model_name = os.getenv("OPENAI_MODEL", "gpt-4")
-            temperature = float(os.getenv("OPENAI_TEMPERATURE", "0.7"))
-            
-            self.logger.info(f"Initializing OpenAI with model: {model_name}")
-            self.llm = ChatOpenAI(
-                api_key=api_key,
-                model_name=model_name,
-                temperature=temperature
-            )
-            self.is_chat_model = True
-            self.logger.info(f"Successfully initialized OpenAI ChatGPT with model: {model_name}")
-        else:
-            # Initialize Ollama
-            try:
-                base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-                model = os.getenv("OLLAMA_MODEL", "llama3.2")
-                self.llm = Ollama(
-                    model=model,
-                    base_url=base_url,
-                    temperature=0.7
-                )
-                self.is_chat_model = False
-                self.logger.info(f"Successfully initialized Ollama LLM with model: {model}")
-            except Exception as e:
-                self.logger.error(f"Error initializing Ollama: {str(e)}")
-                raise
+        # All LLM traffic goes through the async gateway so one slow call never blocks the event loop
+        try:
+            self.gateway = LLMGateway(self.llm_provider)
+        except Exception as e:
+            self.logger.error(f"Error initializing {self.llm_provider} LLM gateway: {str(e)}")
+            raise
 
         # Get the project root directory
         self.project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.."))
@@ -85,31 +59,21 @@ class ChatbotLLMService(MicroserviceBase):
             self.logger.error(f"Error loading service data: {str(e)}")
             raise
 
-    def get_llm_response(self, messages):
-        """Helper method to handle different LLM types"""
-        try:
-            if self.is_chat_model:
-                # For ChatOpenAI
-                response = self.llm.invoke(messages)
-                return response.content if hasattr(response, 'content') else str(response)
-            else:
-                # For Ollama
-                # Convert messages to a single prompt string
-                conversation = []
-                for msg in messages:
-                    if hasattr(msg, 'type'):
-                        if msg.type == 'system':
-                            conversation.append(f"System: {msg.content}")
-                        elif msg.type == 'human':
-                            conversation.append(f"Human: {msg.content}")
-                        elif msg.type == 'ai':
-                            conversation.append(f"Assistant: {msg.content}")
-                    else:
-                        conversation.append(str(msg))
-                
-                prompt = "\n".join(conversation)
-                return self.llm.invoke(prompt)
+        # 'json' asks the model for schema-constrained output, 'text' keeps the legacy bullet format
+        self.extraction_mode = os.getenv("CHATBOT_EXTRACTION_MODE", "json").lower()
+        self.extraction_schema = build_extraction_schema(self.microservices, self.params_list)
+
+        # Keep per-turn prompt size bounded by folding old turns into a rolling summary
+        self.history_manager = ConversationHistoryManager(
+            summarize=lambda prompt: self.get_llm_response(
+                [{"role": "user", "content": prompt}], stage="history_summary"
+            )
+        )
 
+    async def get_llm_response(self, messages, stage: str = "chat") -> str:
+        """Send messages to the configured LLM provider, metrics are recorded under the given stage"""
+        try:
+            return await self.gateway.complete(messages, stage=stage)
         except Exception as e:
             self.logger.error(f"Error getting LLM response: {str(e)}")
             raise
@@ -123,9 +87,23 @@ class ChatbotLLMService(MicroserviceBase):
                 self.logger.error(f"Error in chat endpoint: {str(e)}")
                 raise HTTPException(status_code=500, detail=str(e))
 
+        @self.app.get("/status")
+        async def status():
+            """LLM provider and model this process sends its calls to"""
+            return {"provider": self.llm_provider, "model": getattr(self.gateway.provider, "model", None)}
+
+        @self.app.get("/metrics")
+        async def llm_metrics():
+            """Per-stage token, latency and cache aggregates of the LLM calls made by this process"""
+            return self.gateway.metrics.summary()
+
+        @self.app.on_event("shutdown")
+        async def close_gateway():
+            await self.gateway.close()
+
     async def process_request(self, chat_input):
         try:
-            response, updated_state = self.chatbot_conversation(
+            response, updated_state = await self.chatbot_conversation(
                 chat_input.user_input,
                 chat_input.conversation_state
             )
@@ -158,12 +136,11 @@ class ChatbotLLMService(MicroserviceBase):
         {", ".join([ms['name'] for ms in microservices])}
         """
 
-    def identify_services_and_params(
+    async def identify_services_and_params(
         self,
         conversation: List[str], 
         microservices: List[Dict[str, str]], 
-        params_list: Dict,
-        llm: ChatOpenAI
+        params_list: Dict
     ) -> Tuple[List[str], Dict]:
         params_context = "\n".join([
             f"Service '{service}' options: " + 
@@ -171,6 +148,88 @@ class ChatbotLLMService(MicroserviceBase):
             for service, params in params_list.items()
         ])
         
+        if self.extraction_mode == "json":
+            try:
+                return await self._identify_structured(conversation, microservices, params_list, params_context)
+            except LLMProviderError as e:
+                if e.retryable:
+                    self.logger.error(f"Error in identify_services_and_params: {str(e)}")
+                    return [], {}
+                # Some models/servers reject schema-constrained output, fall back to the text format
+                self.logger.warning(f"Structured extraction unavailable, falling back to text: {str(e)}")
+            except Exception as e:
+                self.logger.error(f"Error in identify_services_and_params: {str(e)}")
+                return [], {}
+
+        return await self._identify_text(conversation, microservices, params_list, params_context)
+
+    async def _identify_structured(
+        self,
+        conversation: List[str],
+        microservices: List[Dict[str, str]],
+        params_list: Dict,
+        params_context: str
+    ) -> Tuple[List[str], Dict]:
+        identification_prompt = f"""Based ONLY on what has been EXPLICITLY mentioned or agreed to by the user in this conversation, identify:
+        1. The relevant services from: {', '.join([ms['name'] for ms in microservices])}
+        2. For each service, the parameter values that were directly mentioned or confirmed by the user.
+
+        Conversation:
+        {' '.join(conversation)}
+
+        Respond with a JSON object of the form:
+        {{"services": {{"service_name1": {{"param1": ["value1", "value2"], "param2": ["value3"]}}}}}}
+
+        Guidelines:
+        - ONLY include services and parameters that the user explicitly mentioned or confirmed
+        - DO NOT include implied or suggested options that weren't confirmed
+        - DO NOT include locations or options that were only mentioned by the assistant
+        - If a service was mentioned but no specific parameters were confirmed, do not include that service
+        - Use parameter values exactly as spelled in this list:
+        {params_context}
+
+        Return ONLY the JSON object, no explanations."""
+
+        response_text = await self.gateway.complete(
+            [{"role": "user", "content": identification_prompt}],
+            json_schema=self.extraction_schema,
+            stage="extraction"
+        )
+        try:
+            services_and_params, errors = validate_extraction(
+                parse_json_response(response_text), microservices, params_list
+            )
+        except ValueError as e:
+            services_and_params, errors = {}, [f"The response is not valid JSON: {str(e)}"]
+
+        if errors:
+            # One targeted repair round is far cheaper than another full round of exchanges
+            self.logger.warning(f"Extraction had {len(errors)} problem(s), asking the model to repair: {errors}")
+            repair_text = await self.gateway.complete(
+                [{"role": "user", "content": build_repair_prompt(identification_prompt, response_text, errors)}],
+                json_schema=self.extraction_schema,
+                stage="extraction_repair"
+            )
+            try:
+                repaired, errors = validate_extraction(
+                    parse_json_response(repair_text), microservices, params_list
+                )
+                if repaired or not services_and_params:
+                    services_and_params = repaired
+            except ValueError as e:
+                self.logger.error(f"Repaired extraction is still not valid JSON: {str(e)}")
+            if errors:
+                self.logger.warning(f"Dropping invalid parts of the extraction: {errors}")
+
+        return list(services_and_params.keys()), services_and_params
+
+    async def _identify_text(
+        self,
+        conversation: List[str],
+        microservices: List[Dict[str, str]],
+        params_list: Dict,
+        params_context: str
+    ) -> Tuple[List[str], Dict]:
         identification_prompt = f"""Based ONLY on what has been EXPLICITLY mentioned or agreed to by the user in this conversation, identify:
         1. The relevant services from: {', '.join([ms['name'] for ms in microservices])}
         2. For each service, list ONLY the parameter values that were directly mentioned or confirmed by the user.
@@ -194,11 +253,9 @@ class ChatbotLLMService(MicroserviceBase):
         Return ONLY the structured list, no explanations."""
 
         try:
-            if self.is_chat_model:
-                response = self.llm.invoke([HumanMessage(content=identification_prompt)])
-                response_text = response.content
-            else:
-                response_text = self.llm.invoke(identification_prompt)
+            response_text = await self.get_llm_response(
+                [{"role": "user", "content": identification_prompt}], stage="extraction"
+            )
             
             services_and_params = {}
             current_service = None
@@ -218,7 +275,7 @@ class ChatbotLLMService(MicroserviceBase):
             self.logger.error(f"Error in identify_services_and_params: {str(e)}")
             return [], {}
 
-    def generate_summary(self, conversation: List[str], available_hours: int, llm: ChatOpenAI) -> str:
+    async def generate_summary(self, conversation: List[str], available_hours: int) -> str:
         summary_prompt = f"""Summarize the tourist's focused plan based on this conversation:
         {' '.join(conversation)}
         
@@ -231,16 +288,12 @@ class ChatbotLLMService(MicroserviceBase):
         Focus on details that will help identify relevant services and parameters."""
 
         try:
-            if self.is_chat_model:
-                response = self.llm.invoke([HumanMessage(content=summary_prompt)])
-                return response.content
-            else:
-                return self.llm.invoke(summary_prompt)
+            return await self.get_llm_response([{"role": "user", "content": summary_prompt}], stage="summary")
         except Exception as e:
             self.logger.error(f"Error generating summary: {str(e)}")
             return "Unable to generate summary at this time."
 
-    def chatbot_conversation(self, user_input: str, conversation_state: Dict) -> Tuple[str, Dict]:
+    async def chatbot_conversation(self, user_input: str, conversation_state: Dict) -> Tuple[str, Dict]:
         try:
             if "system_context" not in conversation_state:
                 conversation_state["system_context"] = self.prepare_system_context(
@@ -249,11 +302,11 @@ class ChatbotLLMService(MicroserviceBase):
                     self.params_list
                 )
                 conversation_state["conversation_history"].append(
-                    SystemMessage(content=conversation_state["system_context"])
+                    {"role": "system", "content": conversation_state["system_context"]}
                 )
 
             # Add user input to conversation history
-            conversation_state["conversation_history"].append(HumanMessage(content=user_input))
+            conversation_state["conversation_history"].append({"role": "user", "content": user_input})
             conversation_state["exchanges"] += 1
 
             # If user disagreed with previous suggestion
@@ -293,25 +346,25 @@ class ChatbotLLMService(MicroserviceBase):
                     Keep the conversation natural and informative.
                 """
 
-            messages = conversation_state["conversation_history"] + [HumanMessage(content=prompt)]
-            assistant_response = self.get_llm_response(messages)
-            conversation_state["conversation_history"].append(AIMessage(content=assistant_response))
+            await self.history_manager.compact(conversation_state)
+            messages = self.history_manager.build_messages(conversation_state) + [{"role": "user", "content": prompt}]
+            assistant_response = await self.get_llm_response(messages)
+            conversation_state["conversation_history"].append({"role": "assistant", "content": assistant_response})
 
             # Check if we have enough exchanges and try to identify services
             if conversation_state["exchanges"] >= conversation_state["max_exchanges"]:
-                # Try to identify services and parameters
-                services, params = self.identify_services_and_params(
-                    [msg.content if hasattr(msg, 'content') else str(msg) for msg in conversation_state["conversation_history"]],
-                    self.microservices,
-                    self.params_list,
-                    self.llm
-                )
-
-                # Generate summary
-                summary = self.generate_summary(
-                    [msg.content if hasattr(msg, 'content') else str(msg) for msg in conversation_state["conversation_history"]],
-                    conversation_state["available_hours"],
-                    self.llm
+                # Identify services and summarize the plan concurrently, they don't depend on each other
+                conversation = self.history_manager.context_texts(conversation_state)
+                (services, params), summary = await asyncio.gather(
+                    self.identify_services_and_params(
+                        conversation,
+                        self.microservices,
+                        self.params_list
+                    ),
+                    self.generate_summary(
+                        conversation,
+                        conversation_state["available_hours"]
+                    )
                 )
                 
                 # Display current and previous suggestions
@@ -352,6 +405,11 @@ class ChatbotLLMService(MicroserviceBase):
             raise
 
 def start_chatbot_llm_service():
+    # Load environment variables from .env file when the service starts, not when it is imported.
+    # Variables already set win, so a harness running with LLM_PROVIDER=fake is never switched to a real API
+    from dotenv import load_dotenv
+    load_dotenv(override=False)
+
     service = ChatbotLLMService()
     service.run()
 
@@ -1,6 +1,7 @@
 import streamlit as st
 import os
 from app.builder.service_center import render_service_manager
+from app.builder.feedback_dashboard import render_feedback_dashboard
 from app.utils.logger import setup_logger
 
 logger = setup_logger("AdminPage")
@@ -32,5 +33,8 @@ def main():
     # Show service manager
     render_service_manager()
 
+    st.markdown("---")
+    render_feedback_dashboard()
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file
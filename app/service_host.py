@@ -0,0 +1,153 @@
+"""
+Long-lived host for one microservice whose code can be swapped without restarting the process.
+
+    python -m app.service_host <service_name> [original|generated]
+
+The listening socket belongs to a small ASGI dispatcher that forwards each request to the current
+service app. POST /_host/reload imports the requested version in the background, starts it and then
+swaps the reference in one assignment: requests already in flight finish on the old app, new requests
+go to the new one, and the old app is shut down once it has drained. Data loaded through
+app.utils.data_access stays in memory across reloads.
+"""
+import asyncio
+import importlib
+import inspect
+import sys
+import time
+from typing import Dict, Optional
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+from app.microservices.base import MicroserviceBase
+from app.utils.logger import setup_logger
+from app.utils.service_manager import service_module_path
+
+logger = setup_logger("ServiceHost")
+
+CONTROL_PREFIX = "/_host"
+DRAIN_TIMEOUT = 30
+
+
+class ReloadParams(BaseModel):
+    version: Optional[str] = None
+
+
+def load_service(service_name: str, version: str) -> MicroserviceBase:
+    """Import (or re-import) a service version and build it with its routes registered"""
+    module_path = service_module_path(service_name, version)
+    if not module_path:
+        raise ValueError(f"{version} version of {service_name} not found")
+
+    importlib.invalidate_caches()
+    if module_path in sys.modules:
+        module = importlib.reload(sys.modules[module_path])
+    else:
+        module = importlib.import_module(module_path)
+
+    service_class = next(
+        (obj for _, obj in inspect.getmembers(module, inspect.isclass)
+         if issubclass(obj, MicroserviceBase) and obj is not MicroserviceBase and obj.__module__ == module.__name__),
+        None
+    )
+    if service_class is None:
+        raise ValueError(f"No MicroserviceBase subclass found in {module_path}")
+    service = service_class()
+    service.register_routes()
+    return service
+
+
+class ServiceHost:
+    def __init__(self, service_name: str, version: str = "original"):
+        self.service_name = service_name
+        self.version = version
+        self.service = load_service(service_name, version)
+        self.port = self.service.port
+        self.loaded_at = time.time()
+        # Requests in flight per app, so a replaced app is only shut down once it has drained
+        self.in_flight: Dict[int, int] = {}
+        self.reload_lock = asyncio.Lock()
+        self.control = FastAPI()
+        self.register_control_routes()
+
+    def register_control_routes(self):
+        @self.control.get(f"{CONTROL_PREFIX}/status")
+        async def status():
+            return {
+                "service": self.service_name,
+                "version": self.version,
+                "loaded_at": self.loaded_at,
+                "in_flight": sum(self.in_flight.values())
+            }
+
+        @self.control.post(f"{CONTROL_PREFIX}/reload")
+        async def reload(params: ReloadParams):
+            try:
+                return await self.reload(params.version or self.version)
+            except Exception as e:
+                logger.error(f"Reload of {self.service_name} failed, keeping {self.version}: {str(e)}")
+                raise HTTPException(status_code=500, detail=f"{type(e).__name__}: {str(e)}")
+
+    async def reload(self, version: str) -> Dict:
+        async with self.reload_lock:
+            start = time.perf_counter()
+            # Import and data loading happen off the event loop, the current app keeps serving meanwhile
+            service = await asyncio.to_thread(load_service, self.service_name, version)
+            await service.app.router.startup()
+
+            old_service, self.service = self.service, service
+            self.version = version
+            self.loaded_at = time.time()
+            elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+            logger.info(f"Swapped {self.service_name} to {version} version in {elapsed_ms}ms")
+
+        asyncio.create_task(self._retire(old_service))
+        return {"service": self.service_name, "version": version, "reload_ms": elapsed_ms}
+
+    async def _retire(self, service: MicroserviceBase):
+        deadline = time.monotonic() + DRAIN_TIMEOUT
+        while self.in_flight.get(id(service.app)) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        self.in_flight.pop(id(service.app), None)
+        await service.app.router.shutdown()
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.service.app.router.startup()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.service.app.router.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope.get("path", "").startswith(f"{CONTROL_PREFIX}/"):
+            await self.control(scope, receive, send)
+            return
+
+        # Read the reference once, so a swap mid-request never mixes two versions
+        app = self.service.app
+        key = id(app)
+        self.in_flight[key] = self.in_flight.get(key, 0) + 1
+        try:
+            await app(scope, receive, send)
+        finally:
+            self.in_flight[key] = self.in_flight.get(key, 1) - 1
+
+    def run(self):
+        logger.info(f"Hosting {self.version} version of {self.service_name} on port {self.port}")
+        uvicorn.run(self, host="0.0.0.0", port=self.port)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python -m app.service_host <service_name> [original|generated]")
+    ServiceHost(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else "original").run()
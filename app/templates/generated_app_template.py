@@ -6,20 +6,25 @@ import streamlit as st
 import requests
 import logging
 import json
-from utils.port_manager import get_port_manager
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+{process_setup}
 logger = logging.getLogger(__name__)
 
-# Set the working directory to the app directory
-os.chdir(os.path.dirname(os.path.abspath(__file__)))
-
 st.set_page_config(page_title="My IIIT Companion", page_icon="🏫", layout="wide")
 
 st.title("My IIIT Companion")
 
-port_manager = get_port_manager()
+{service_registry}
+
+@st.cache_resource
+def get_http_session():
+    # One keep-alive connection pool per app process, shared by every rerun and session
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=16)
+    session.mount("http://", adapter)
+    return session
 
 def render_metric_card(header, value, description=None):
     st.markdown(
@@ -50,6 +55,46 @@ def render_numeric_data(key, value):
     else:
         render_info_card(key.replace('_', ' ').title(), value)
 
+# Lists of at least this many records with identical keys are shown as one table instead of cards
+TABLE_MIN_ITEMS = 4
+TABLE_ROW_HEIGHT = 35
+
+def is_tabular(value):
+    if len(value) < TABLE_MIN_ITEMS or not all(isinstance(item, dict) for item in value):
+        return False
+    keys = set(value[0])
+    return all(set(item) == keys for item in value)
+
+def table_column_config(df):
+    config = {{}}
+    for column in df.columns:
+        label = column.replace('_', ' ').title()
+        sample = df[column].dropna()
+        if pd.api.types.is_numeric_dtype(df[column]):
+            config[column] = st.column_config.NumberColumn(label)
+        elif not sample.empty and sample.map(lambda v: isinstance(v, str) and v.startswith(('http://', 'https://'))).all():
+            config[column] = st.column_config.LinkColumn(label)
+        elif not sample.empty and sample.map(lambda v: isinstance(v, list)).all():
+            config[column] = st.column_config.ListColumn(label)
+        else:
+            config[column] = st.column_config.TextColumn(label)
+    return config
+
+def render_table_data(value):
+    df = pd.DataFrame.from_records(value)
+    for column in df.columns:
+        # Arrow needs one type per column, nested objects are shown as JSON text
+        if df[column].map(lambda v: isinstance(v, dict) or (isinstance(v, list) and any(isinstance(i, (dict, list)) for i in v))).any():
+            df[column] = df[column].map(json.dumps)
+    # A single grid element whatever the row count, scrolling is virtualized by the browser
+    st.dataframe(
+        df,
+        column_config=table_column_config(df),
+        hide_index=True,
+        use_container_width=True,
+        height=min(len(df), 15) * TABLE_ROW_HEIGHT + TABLE_ROW_HEIGHT + 3
+    )
+
 def render_list_data(key, value):
     st.markdown(f"### {{key.replace('_', ' ').title()}}")
     
@@ -57,6 +102,10 @@ def render_list_data(key, value):
         st.info("No items to display.")
         return
 
+    if is_tabular(value):
+        render_table_data(value)
+        return
+
     cols = st.columns(3)
     for idx, item in enumerate(value):
         with cols[idx % 3]:
@@ -114,7 +163,98 @@ def render_service_data(service_name, data):
     
     st.markdown("---")
 
+def fetch_via_aggregator(port, service_name, request):
+    # The aggregator's pooled connections and response cache are shared by every app
+    payload = {{"services": [
+        {{"name": service_name, "path": request['path'], "query": request['query'], "params": request['body']}}
+    ]}}
+    response = get_http_session().post(f"http://localhost:{{port}}/aggregator", json=payload, timeout=10)
+    response.raise_for_status()
+    result = response.json()
+    if service_name in result['results']:
+        return result['results'][service_name]
+    raise RuntimeError(result['errors'].get(service_name, "No result"))
+
+def fetch_service(service_name, request):
+    # Runs in a worker thread, so it must not call any st.* function
+    aggregator_port = resolve_service_port("aggregator")
+    if aggregator_port:
+        try:
+            return fetch_via_aggregator(aggregator_port, service_name, request)
+        except requests.exceptions.ConnectionError as e:
+            # Only an aggregator that is down falls back, a slow one is not waited out twice
+            logger.warning(f"Aggregator unreachable, querying {{service_name}} directly: {{e}}")
+
+    port = resolve_service_port(service_name)
+    if not port:
+        raise ValueError(f"Service info not found for {{service_name}} service")
+    # Parameters were mapped onto the service's route, body and query when the app was generated
+    logger.info(f"Sending request to {{service_name}} on port {{port}}: {{request}}")
+    response = get_http_session().post(
+        f"http://localhost:{{port}}{{request['path']}}", json=request['body'], params=request['query'], timeout=5
+    )
+    response.raise_for_status()
+    return response.json()
+
+def render_service_error(service_name, error):
+    title = service_name.capitalize()
+    if isinstance(error, ValueError):
+        logger.error(str(error))
+        st.error(str(error))
+    elif isinstance(error, requests.exceptions.ConnectionError):
+        logger.error(f"Connection error for {{title}} service: {{error}}")
+        st.error(f"Unable to connect to {{title}} service. Please ensure the service is running.")
+    elif isinstance(error, requests.exceptions.Timeout):
+        logger.error(f"Timeout error for {{title}} service: {{error}}")
+        st.error(f"Connection to {{title}} service timed out. The service might be overloaded or not responding.")
+    elif isinstance(error, requests.exceptions.RequestException):
+        logger.error(f"Request error for {{title}} service: {{error}}")
+        st.error(f"An error occurred while connecting to {{title}} service: {{str(error)}}")
+    else:
+        logger.error(f"Unexpected error for {{title}} service: {{error}}")
+        st.error(f"Something went wrong while loading {{title}} information: {{str(error)}}")
+
+def render_services(service_calls):
+    # Lay out one panel per service up front so results can fill them in as they arrive
+    panels = {{}}
+    for call in service_calls:
+        panel = st.container()
+        panel.header(f"{{call['name'].capitalize()}} Information")
+        panels[call['name']] = (panel, panel.empty())
+        panels[call['name']][1].info(f"Loading {{call['name'].replace('_', ' ')}}...")
+
+    # Calls the service would reject are reported without sending them
+    for call in service_calls:
+        if call.get('error'):
+            panel, placeholder = panels[call['name']]
+            placeholder.empty()
+            with panel:
+                render_service_error(call['name'], ValueError(f"Cannot query {{call['name']}}: {{call['error']}}"))
+    pending = [call for call in service_calls if not call.get('error')]
+    if not pending:
+        return
+
+    # All services are queried concurrently through their cached fetchers, so reruns within a service's
+    # TTL make no request and page load is bounded by the slowest service
+    with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+        futures = {{
+            executor.submit(call['fetch'], call['name'], call['request']): call['name']
+            for call in pending
+        }}
+        for future in as_completed(futures):
+            service_name = futures[future]
+            panel, placeholder = panels[service_name]
+            placeholder.empty()
+            with panel:
+                try:
+                    render_service_data(service_name, future.result())
+                    logger.info(f"Successfully connected to {{service_name.capitalize()}} service and displayed data")
+                except Exception as e:
+                    render_service_error(service_name, e)
+
 {services}
 
+render_services(service_calls)
+
 {debug_content}
 """
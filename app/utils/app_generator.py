@@ -1,23 +1,56 @@
 import os
+import socket
+import string
 import subprocess
 import shutil
 import json
+import hashlib
 import app.config as config
 from app.utils.logger import setup_logger
 from app.utils.port_manager import get_port_manager
+from app.utils.app_specs import save_app_spec, load_app_spec
+from app.utils.app_lifecycle import get_app_lifecycle_manager
+from app.utils.param_adapters import get_param_adapters
 from app.templates.generated_app_template import GENERATED_APP_TEMPLATE
 
+# Part of every app's content hash, so editing the template never reuses apps built from the old one
+TEMPLATE_VERSION = hashlib.sha256(GENERATED_APP_TEMPLATE.encode("utf-8")).hexdigest()[:12]
+
+
+def _prerender_template(template):
+    """Split the template into static text (braces already unescaped) and placeholder names, once"""
+    parts = []
+    for literal, field, _, _ in string.Formatter().parse(template):
+        if literal:
+            parts.append((literal, None))
+        if field is not None:
+            parts.append((None, field))
+    return parts
+
+
+PRERENDERED_TEMPLATE = _prerender_template(GENERATED_APP_TEMPLATE)
+
 
 class AppGenerator:
-    def __init__(self):
+    def __init__(self, profile=None):
         self.logger = setup_logger("AppGenerator")
         self.port_manager = get_port_manager()
-        self.used_ports = [10000]
+        self.lifecycle = get_app_lifecycle_manager()
+        self.param_adapters = get_param_adapters()
+        # 'debug' apps resolve ports from services.toml on each call and show registry details in the sidebar,
+        # 'production' apps have ports baked in at generation time and do no per-rerun file I/O
+        debug = os.getenv("ENABLE_DEBUG", "false").lower() == "true"
+        self.profile = (profile or os.getenv("GENERATED_APP_PROFILE", "debug" if debug else "production")).lower()
+        # 'process' runs one Streamlit server per app, 'shared' stores a spec served by the multi-tenant app host
+        self.runtime = os.getenv("GENERATED_APP_RUNTIME", "process").lower()
 
     def generate_app(self, selected_services, parameters):
         self.logger.info(f"Generating app with services: {selected_services}")
         self.logger.info(f"Service parameters: {parameters}")
 
+        if self.runtime == "shared":
+            return self._generate_hosted_app(selected_services, parameters)
+
         if config.GENERATED_APPS_DIR is None:
             self.logger.error(
                 "GENERATED_APPS_DIR is None. Make sure config.set_paths() and config.setup() have been called."
@@ -26,57 +59,122 @@ class AppGenerator:
                 "GENERATED_APPS_DIR is not set. Configuration may not have been initialized properly."
             )
 
-        port = self.used_ports[-1] - 1
-        self.used_ports.append(port)
-        app_dir = os.path.join(config.GENERATED_APPS_DIR, f"app_{port}")
+        # Ports are released when idle apps are reaped, so directories are named by content hash instead
+        service_registry = self._generate_service_registry(selected_services)
+        service_requests = self._adapt_service_requests(selected_services, parameters)
+        app_id = self.app_key(selected_services, parameters, service_registry, service_requests)
+        app_dir = os.path.join(config.GENERATED_APPS_DIR, f"app_{app_id}")
+        app_file_path = os.path.join(app_dir, "app.py")
+
+        app_url = self.lifecycle.ensure_running(app_id)
+        if app_url:
+            self.logger.info(f"Reusing running app {app_id} at {app_url}")
+            # Reuse counts as use, so the reaper does not stop an app that keeps being requested
+            self.lifecycle.touch(app_id)
+            return app_url
+        if os.path.exists(app_file_path):
+            self.logger.info(f"Reusing generated app at {app_file_path}")
+            return self.lifecycle.start(app_id, app_file_path)
+
         os.makedirs(app_dir, exist_ok=True)
 
         self.logger.info(f"Created app directory: {app_dir}")
 
-        # Copy utility files
-        utils_dir = os.path.join(app_dir, "utils")
-        os.makedirs(utils_dir, exist_ok=True)
-        shutil.copy(os.path.join(config.APP_DIR, "utils", "port_manager.py"), utils_dir)
-        shutil.copy(os.path.join(config.APP_DIR, "utils", "logger.py"), utils_dir)
-
-        self.logger.info(f"Copied utility files to: {utils_dir}")
-
-        # Copy services.toml
-        services_toml_path = os.path.join(app_dir, "services.toml")
-        shutil.copy(self.port_manager.services_file, services_toml_path)
-        self.logger.info(f"Copied services.toml to: {services_toml_path}")
-
-        # Log the contents of services.toml
-        with open(services_toml_path, 'r') as f:
-            self.logger.info(f"Contents of services.toml:\n{f.read()}")
-
-        # Copy templates directory
-        templates_dir = os.path.join(app_dir, "templates")
-        os.makedirs(templates_dir, exist_ok=True)
-        shutil.copy(
-            os.path.join(config.APP_DIR, "templates", "generated_app_template.py"),
-            templates_dir,
-        )
+        if self.profile == "debug":
+            # Copy utility files
+            utils_dir = os.path.join(app_dir, "utils")
+            os.makedirs(utils_dir, exist_ok=True)
+            shutil.copy(os.path.join(config.APP_DIR, "utils", "port_manager.py"), utils_dir)
+            shutil.copy(os.path.join(config.APP_DIR, "utils", "logger.py"), utils_dir)
 
-        self.logger.info(f"Copied templates to: {templates_dir}")
+            self.logger.info(f"Copied utility files to: {utils_dir}")
 
-        app_content = self._generate_app_content(selected_services, parameters, app_dir)
-        app_file_path = os.path.join(app_dir, "app.py")
+            # Copy services.toml
+            services_toml_path = os.path.join(app_dir, "services.toml")
+            shutil.copy(self.port_manager.services_file, services_toml_path)
+            self.logger.info(f"Copied services.toml to: {services_toml_path}")
 
-        with open(app_file_path, "w", encoding="utf-8") as f:
+            # Log the contents of services.toml
+            with open(services_toml_path, 'r') as f:
+                self.logger.info(f"Contents of services.toml:\n{f.read()}")
+
+            # Copy templates directory, the app itself has the template inlined
+            templates_dir = os.path.join(app_dir, "templates")
+            os.makedirs(templates_dir, exist_ok=True)
+            shutil.copy(
+                os.path.join(config.APP_DIR, "templates", "generated_app_template.py"),
+                templates_dir,
+            )
+
+            self.logger.info(f"Copied templates to: {templates_dir}")
+
+        app_content = self._generate_app_content(selected_services, parameters, service_registry, service_requests)
+
+        # Write then rename, so a concurrent identical request never starts a half-written app
+        tmp_path = f"{app_file_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
             f.write(app_content)
+        os.replace(tmp_path, app_file_path)
 
         self.logger.info(f"Generated app content and wrote to: {app_file_path}")
 
-        self._run_app(app_file_path, port)
-        return f"http://localhost:{port}"
+        return self.lifecycle.start(app_id, app_file_path)
 
-    def _generate_app_content(self, selected_services, parameters, app_dir):
-        service_content = ""
-        for service in selected_services:
-            service_content += self._generate_service_content(service, parameters.get(service, {}))
+    def app_key(self, selected_services, parameters, service_registry=None, service_requests=None):
+        """Content hash of an app, identical requests map to the same app directory or spec"""
+        key = {
+            "services": selected_services,
+            "parameters": parameters,
+            "template": TEMPLATE_VERSION,
+            "profile": self.profile,
+            # Production apps bake in service ports, so a port change must produce a new app
+            "registry": service_registry,
+            # Requests are baked in too: an app built while a service was down (passthrough parameters or
+            # an error) must not be reused once the service is back and its adapter maps them properly
+            "requests": service_requests
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+    def _generate_hosted_app(self, selected_services, parameters):
+        # The host resolves service ports itself when it renders a spec
+        app_id = self.app_key(selected_services, parameters)
+        if load_app_spec(app_id) is None:
+            save_app_spec(selected_services, parameters, app_id=app_id)
+            self.logger.info(f"Saved app spec {app_id} to: {config.APP_SPECS_DIR}")
+        else:
+            self.logger.info(f"Reusing app spec {app_id}")
+        self._ensure_app_host()
+        return f"http://localhost:{config.APP_HOST_PORT}/?app_id={app_id}"
+
+    def _ensure_app_host(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            if sock.connect_ex(("localhost", config.APP_HOST_PORT)) == 0:
+                return
+        host_path = os.path.join(config.APP_DIR, "app_host.py")
+        self.logger.info(f"Starting app host at {host_path} on port {config.APP_HOST_PORT}")
+        subprocess.Popen(
+            ["streamlit", "run", host_path, "--server.port", str(config.APP_HOST_PORT), "--server.headless", "true"]
+        )
 
-        debug_content = f"""
+    def build_app_source(self, selected_services, parameters, hosted=False):
+        """
+        Render the Streamlit source of an app without writing it to disk.
+        Hosted apps share their process with other tenants, so they leave logging and the working directory alone.
+        """
+        return self._generate_app_content(selected_services, parameters, hosted=hosted)
+
+    def _generate_app_content(
+        self, selected_services, parameters, service_registry=None, service_requests=None, hosted=False
+    ):
+        if service_requests is None:
+            service_requests = self._adapt_service_requests(selected_services, parameters)
+        service_content = self._generate_cached_fetchers(selected_services)
+        service_content += "\nservice_calls = [\n"
+        for service, service_request in zip(selected_services, service_requests):
+            service_content += self._generate_service_content(service, service_request)
+        service_content += "]\n"
+
+        debug_content = "" if self.profile != "debug" else f"""
 # Debugging information
 selected_services = {json.dumps(selected_services)}
 parameters = {json.dumps(parameters)}
@@ -107,75 +205,87 @@ st.sidebar.write(f"Files in current directory: {{files}}")
 logger.info(f"Files in current directory: {{files}}")
 """
 
+        process_setup = "# Logging and the working directory are configured by the app host" if hosted else """# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+# Set the working directory to the app directory
+os.chdir(os.path.dirname(os.path.abspath(__file__)))"""
+
+        values = {
+            "process_setup": process_setup,
+            "service_registry": service_registry or self._generate_service_registry(selected_services),
+            "services": service_content,
+            "debug_content": debug_content
+        }
         try:
-            return GENERATED_APP_TEMPLATE.format(
-                services=service_content,
-                debug_content=debug_content
-            )
+            return "".join(text if field is None else values[field] for text, field in PRERENDERED_TEMPLATE)
         except KeyError as e:
             self.logger.error(f"Template formatting error: {str(e)}")
             raise ValueError(f"Template formatting error: {str(e)}")
 
-    def _generate_service_content(self, service, params):
-        param_dict = json.dumps(params)
-        service_name = service.replace('_service', '')
-        return f"""
-# {service_name.capitalize()} Service
-st.header("{service_name.capitalize()} Information")
-try:
+    def _generate_service_registry(self, selected_services):
+        if self.profile == "debug":
+            return """from utils.port_manager import get_port_manager
+
+port_manager = get_port_manager()
+
+def resolve_service_port(service_name):
     logger.info(f"Attempting to get service info for {service_name}")
-    service_info = port_manager.get_service_info('{service_name}')
-    logger.info(f"Service info for {service_name}: {{service_info}}")
-    if not service_info:
-        raise ValueError(f"Service info not found for {service_name} service")
-    port = service_info['port']
-    logger.info(f"Attempting to connect to {service_name.capitalize()} service on port {{port}}")
-    params = {param_dict}
-    logger.info(f"Sending request with params: {{params}}")
-    
-    if '{service_name}' == 'restaurant_finder':
-        # Ensure the parameters match the RestaurantFinderParams model
-        request_params = {{
-            'location': params.get('location'),
-            'cuisine_type': params.get('cuisine_type'),
-            'price_range': params.get('price_range'),
-            'dietary_restrictions': params.get('dietary_restrictions'),
-            'group_size': params.get('group_size')
-        }}
-    elif '{service_name}' == 'travel_options':
-        # Ensure the parameters match the TravelOptionsParams model
-        request_params = {{
-            'destination': params.get('destination'),
-            'available_time': params.get('available_time'),
-            'preferred_mode': params.get('preferred_mode')
-        }}
-    else:
-        request_params = params
-    
-    # Remove None values
-    request_params = {{k: v for k, v in request_params.items() if v is not None}}
-    
-    response = requests.post(f"http://localhost:{{port}}/{service_name}", json=request_params, timeout=5)
-    response.raise_for_status()
-    data = response.json()
-    render_service_data('{service_name}', data)
-    logger.info(f"Successfully connected to {service_name.capitalize()} service and displayed data")
-except ValueError as e:
-    logger.error(str(e))
-    st.error(str(e))
-except requests.exceptions.ConnectionError as e:
-    logger.error(f"Connection error for {service_name.capitalize()} service: {{e}}")
-    st.error(f"Unable to connect to {service_name.capitalize()} service. Please ensure the service is running.")
-except requests.exceptions.Timeout as e:
-    logger.error(f"Timeout error for {service_name.capitalize()} service: {{e}}")
-    st.error(f"Connection to {service_name.capitalize()} service timed out. The service might be overloaded or not responding.")
-except requests.exceptions.RequestException as e:
-    logger.error(f"Request error for {service_name.capitalize()} service: {{e}}")
-    st.error(f"An error occurred while connecting to {service_name.capitalize()} service: {{str(e)}}")
+    service_info = port_manager.get_service_info(service_name)
+    logger.info(f"Service info for {service_name}: {service_info}")
+    return service_info.get('port') if service_info else None"""
+
+        # Resolve every port once, now, instead of reading the registry on each rerun
+        service_ports = {}
+        for service in selected_services:
+            service_name = service.replace('_service', '')
+            port = self.port_manager.get_service_info(service_name).get("port")
+            if port is not None:
+                service_ports[service_name] = port
+            else:
+                self.logger.warning(f"Service info not found for {service_name}, it will show as unavailable")
+        # Apps send all their requests through the aggregator when it is registered
+        aggregator_port = self.port_manager.get_service_info("aggregator").get("port")
+        if aggregator_port is not None:
+            service_ports["aggregator"] = aggregator_port
+        return f"""# Service ports resolved when this app was generated
+SERVICE_PORTS = {json.dumps(service_ports)}
+
+def resolve_service_port(service_name):
+    return SERVICE_PORTS.get(service_name)"""
+
+    def _service_cache_ttl(self, service):
+        service_name = service.replace('_service', '')
+        return config.SERVICE_CACHE_TTLS.get(service_name, config.DEFAULT_SERVICE_CACHE_TTL)
+
+    def _generate_cached_fetchers(self, selected_services):
+        # st.cache_data takes a fixed TTL, so emit one cached fetcher per distinct TTL
+        content = ""
+        for ttl in sorted({self._service_cache_ttl(service) for service in selected_services}):
+            content += f"""
+@st.cache_data(ttl={ttl}, show_spinner=False)
+def fetch_service_ttl_{ttl}(service_name, request):
+    return fetch_service(service_name, request)
 """
+        return content
 
-    def _run_app(self, app_file_path, port):
-        self.logger.info(f"Running app at {app_file_path} on port {port}")
-        subprocess.Popen(
-            ["streamlit", "run", app_file_path, "--server.port", str(port)]
-        )
+    def _adapt_service_requests(self, selected_services, parameters):
+        """Map chatbot parameters onto each service's request model now, so the app sends requests as-is"""
+        service_requests = []
+        for service in selected_services:
+            service_name = service.replace('_service', '')
+            port = self.port_manager.get_service_info(service_name).get("port")
+            request, errors = self.param_adapters.adapt(service_name, port, parameters.get(service, {}))
+            service_requests.append({"request": request, "errors": errors})
+        return service_requests
+
+    def _generate_service_content(self, service, service_request):
+        service_name = service.replace('_service', '')
+        ttl = self._service_cache_ttl(service)
+        request, errors = service_request["request"], service_request["errors"]
+        call = f"""{{"name": {json.dumps(service_name)}, "request": {json.dumps(request)}, "fetch": fetch_service_ttl_{ttl}"""
+        if errors:
+            self.logger.warning(f"{service_name} request would be rejected: {'; '.join(errors)}")
+            call += f""", "error": {json.dumps('; '.join(errors))}"""
+        return f"""    {call}}},
+"""
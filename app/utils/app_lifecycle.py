@@ -0,0 +1,190 @@
+import os
+import socket
+import subprocess
+import threading
+import time
+from typing import Dict, Optional
+from app.utils.logger import setup_logger
+from app.utils.port_manager import get_port_manager
+
+APP_PORT_MAX: int = 9999
+
+
+class AppLifecycleManager:
+    """Tracks generated app processes, stops idle ones and caps how many run at once (LRU eviction)"""
+
+    def __init__(
+        self,
+        idle_timeout: Optional[float] = None,
+        max_live_apps: Optional[int] = None,
+        reap_interval: Optional[float] = None
+    ):
+        self.logger = setup_logger("AppLifecycleManager")
+        self.port_manager = get_port_manager()
+        self.idle_timeout = idle_timeout or float(os.getenv("APP_IDLE_TIMEOUT", "1800"))
+        self.max_live_apps = max_live_apps or int(os.getenv("MAX_LIVE_APPS", "10"))
+        self.reap_interval = reap_interval or float(os.getenv("APP_REAP_INTERVAL", "60"))
+        # app_id -> {"app_file_path", "port", "process", "last_access"}, port and process are None once stopped
+        self.apps: Dict[str, Dict] = {}
+        self._lock = threading.RLock()
+        self._reaper = None
+
+    def _live_apps(self) -> Dict[str, Dict]:
+        return {app_id: app for app_id, app in self.apps.items() if app["process"] is not None}
+
+    def _port_in_use(self, port: int) -> bool:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            return sock.connect_ex(("localhost", port)) == 0
+
+    def _allocate_port(self) -> int:
+        # App ports are handed out downwards from the top of the range so they stay clear of service ports
+        service_ports = {service["port"] for service in self.port_manager.get_all_services().values()}
+        for port in range(APP_PORT_MAX, 0, -1):
+            if port in service_ports or port in self.port_manager.app_ports or self._port_in_use(port):
+                continue
+            self.port_manager.app_ports.add(port)
+            return port
+        raise ValueError("No available ports")
+
+    def start(self, app_id: str, app_file_path: str) -> str:
+        """Launch an app process, evicting the least recently used app if the cap is reached"""
+        retired = []
+        with self._lock:
+            live = self._live_apps()
+            if app_id in live:
+                if live[app_id]["process"].poll() is None:
+                    # Started by a concurrent identical request
+                    self.touch(app_id)
+                    return f"http://localhost:{live[app_id]['port']}"
+                retired.append(self._detach(app_id))
+                live.pop(app_id)
+            while len(live) >= self.max_live_apps:
+                lru_id = min(live, key=lambda key: live[key]["last_access"])
+                self.logger.info(f"Live app cap of {self.max_live_apps} reached, evicting {lru_id}")
+                retired.append(self._detach(lru_id))
+                live.pop(lru_id)
+
+            port = self._allocate_port()
+            self.logger.info(f"Running app at {app_file_path} on port {port}")
+            process = subprocess.Popen(
+                ["streamlit", "run", app_file_path, "--server.port", str(port), "--server.headless", "true"]
+            )
+            self.apps[app_id] = {
+                "app_file_path": app_file_path,
+                "port": port,
+                "process": process,
+                "last_access": time.time()
+            }
+            self._ensure_reaper()
+        self._terminate(retired)
+        return f"http://localhost:{port}"
+
+    def ensure_running(self, app_id: str) -> Optional[str]:
+        """URL of a known app, restarting it if it was stopped. None for unknown apps"""
+        with self._lock:
+            app = self.apps.get(app_id)
+            if app is None:
+                return None
+            if app["process"] is not None and app["process"].poll() is None:
+                self.touch(app_id)
+                return f"http://localhost:{app['port']}"
+            if app["process"] is not None:
+                # Exited on its own, clear its port before relaunching
+                self._detach(app_id)
+            app_file_path = app["app_file_path"]
+        self.logger.info(f"Restarting app {app_id}")
+        return self.start(app_id, app_file_path)
+
+    def touch(self, app_id: str):
+        with self._lock:
+            if app_id in self.apps:
+                self.apps[app_id]["last_access"] = time.time()
+
+    def _detach(self, app_id: str) -> Optional[subprocess.Popen]:
+        """Mark an app stopped and release its port, returning its process. Call with the lock held"""
+        app = self.apps.get(app_id)
+        if app is None or app["process"] is None:
+            return None
+        process = app["process"]
+        try:
+            self.port_manager.release_app_port(app["port"])
+        except ValueError as e:
+            self.logger.warning(str(e))
+        self.logger.info(f"Stopped app {app_id} and released port {app['port']}")
+        app["process"] = None
+        app["port"] = None
+        return process
+
+    def _terminate(self, processes):
+        # Runs without the lock, so a slow shutdown never blocks other sessions starting apps.
+        # A released port stays skipped by _allocate_port until the old process has closed it
+        for process in processes:
+            if process is None or process.poll() is not None:
+                continue
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def stop(self, app_id: str):
+        """Terminate an app process and release its port, keeping it known so it can be restarted"""
+        with self._lock:
+            process = self._detach(app_id)
+        self._terminate([process])
+
+    def _has_connections(self, app: Dict) -> bool:
+        """An open browser tab keeps a websocket to its app, so established connections mean the app is in use"""
+        import psutil
+
+        try:
+            connections = psutil.Process(app["process"].pid).net_connections(kind="tcp")
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return False
+        return any(
+            conn.status == psutil.CONN_ESTABLISHED and conn.laddr and conn.laddr.port == app["port"]
+            for conn in connections
+        )
+
+    def reap(self):
+        """Refresh last-access times from open connections and stop apps idle past the timeout"""
+        now = time.time()
+        retired = []
+        with self._lock:
+            for app_id, app in list(self._live_apps().items()):
+                if app["process"].poll() is not None:
+                    self.logger.info(f"App {app_id} exited with code {app['process'].returncode}")
+                    retired.append(self._detach(app_id))
+                elif self._has_connections(app):
+                    app["last_access"] = now
+                elif now - app["last_access"] > self.idle_timeout:
+                    self.logger.info(f"App {app_id} idle for {now - app['last_access']:.0f}s, stopping it")
+                    retired.append(self._detach(app_id))
+        self._terminate(retired)
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(self.reap_interval)
+            try:
+                self.reap()
+            except Exception as e:
+                self.logger.error(f"Error reaping idle apps: {str(e)}")
+
+    def _ensure_reaper(self):
+        if self._reaper is None:
+            self._reaper = threading.Thread(target=self._reap_loop, name="app-reaper", daemon=True)
+            self._reaper.start()
+
+
+# Global instance of AppLifecycleManager, shared by every builder session
+_app_lifecycle_manager = None
+_app_lifecycle_manager_lock = threading.Lock()
+
+
+def get_app_lifecycle_manager():
+    global _app_lifecycle_manager
+    if _app_lifecycle_manager is None:
+        with _app_lifecycle_manager_lock:
+            if _app_lifecycle_manager is None:
+                _app_lifecycle_manager = AppLifecycleManager()
+    return _app_lifecycle_manager
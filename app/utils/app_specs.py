@@ -0,0 +1,41 @@
+import json
+import os
+import re
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+import app.config as config
+
+
+def _spec_path(app_id: str) -> str:
+    if config.APP_SPECS_DIR is None:
+        raise ValueError("APP_SPECS_DIR is not set. Call config.set_paths() first.")
+    # App ids come from query strings, never let them escape the specs directory
+    if not re.fullmatch(r"[A-Za-z0-9_-]+", app_id):
+        raise ValueError(f"Invalid app id: {app_id}")
+    return os.path.join(config.APP_SPECS_DIR, f"{app_id}.json")
+
+
+def save_app_spec(selected_services: List[str], parameters: Dict, app_id: Optional[str] = None) -> Dict:
+    """Store a generated app as a JSON spec (services plus parameters) and return it"""
+    spec = {
+        "app_id": app_id or uuid.uuid4().hex[:12],
+        "services": selected_services,
+        "parameters": parameters,
+        "created_at": datetime.now().isoformat()
+    }
+    path = _spec_path(spec["app_id"])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(spec, f, indent=2)
+    os.replace(tmp_path, path)
+    return spec
+
+
+def load_app_spec(app_id: str) -> Optional[Dict]:
+    path = _spec_path(app_id)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
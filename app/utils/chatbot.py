@@ -9,6 +9,8 @@ def initialize_conversation() -> Dict:
     """Initialize the conversation state"""
     return {
         "conversation_history": [],
+        "history_summary": "",
+        "summarized_messages": 0,
         "microservices": [],
         "system_summary": "",
         "params_list": {},
@@ -47,7 +49,9 @@ def chatbot_conversation(user_input: str, conversation_state: Dict) -> Tuple[str
 
         # Send request to chatbot service
         logger.info(f"Sending request to chatbot service: {payload}")
-        response = requests.post(url, json=payload, timeout=30)
+        # A turn can involve several LLM calls, each bounded by the gateway's own deadline
+        timeout = float(os.getenv("CHATBOT_TIMEOUT", "90"))
+        response = requests.post(url, json=payload, timeout=timeout)
         response.raise_for_status()
 
         # Process response
@@ -0,0 +1,304 @@
+import bisect
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.utils.logger import setup_logger
+
+logger = setup_logger("DataAccess")
+
+# Written by dynamic/service_manager.py from its json_data_sources, read by the generated services
+DATA_SOURCES_PATH = os.getenv("DATA_SOURCES_PATH", "data/data_sources.json")
+
+
+def parse_datetime(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    # The data files store naive local times
+    return parsed.astimezone().replace(tzinfo=None) if parsed.tzinfo else parsed
+
+
+def parse_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def normalize_text(value: Any) -> Optional[str]:
+    return str(value).strip().casefold() if value is not None else None
+
+
+def field_type(schema: Dict) -> str:
+    """One of 'datetime', 'number', 'array' or 'string' for a JSON schema property"""
+    if schema.get("format") in ("date-time", "date"):
+        return "datetime"
+    if schema.get("type") in ("integer", "number"):
+        return "number"
+    if schema.get("type") == "array":
+        return "array"
+    return "string"
+
+
+def infer_field_type(values: List[Any]) -> str:
+    """Type of a field the schema does not describe, from the first value present"""
+    sample = next((v for v in values if v is not None), None)
+    if isinstance(sample, (int, float)) and not isinstance(sample, bool):
+        return "number"
+    if isinstance(sample, list):
+        return "array"
+    return "string"
+
+
+SORT_KEYS: Dict[str, Callable[[Any], Any]] = {
+    "datetime": parse_datetime,
+    "number": parse_number,
+}
+
+
+class DataSource:
+    """
+    Read-only, indexed view over one JSON data file.
+
+    Records are returned as they appear in the file and are shared by every caller, so they must not
+    be modified. Indexes are built on first use of a field: equality lookups go through a hash index,
+    range and nearest lookups through a sorted index of the typed values.
+    """
+
+    def __init__(self, name: str, path: str, schema: Optional[Dict] = None):
+        self.name = name
+        self.path = path
+        self.schema = schema or {}
+        self.records: List[Dict] = []
+        # Keys of object-shaped sources ({"Charminar": {...}}), parallel to records
+        self.keys: List[str] = []
+        self._equality_indexes: Dict[str, Dict[str, List[int]]] = {}
+        # field -> normalized value -> value as first spelled in the data
+        self._spellings: Dict[str, Dict[str, Any]] = {}
+        self._sorted_indexes: Dict[str, Tuple[List[Any], List[int]]] = {}
+        self._grouped_indexes: Dict[Tuple[str, str], Dict[str, Tuple[List[Any], List[int]]]] = {}
+        self._key_positions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._load()
+        self.fields = self._schema_fields()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            logger.error(f"{self.path} not found")
+            return
+        except json.JSONDecodeError:
+            logger.error(f"Error decoding {self.path}")
+            return
+
+        if isinstance(data, dict):
+            self.keys = list(data.keys())
+            self.records = [data[key] for key in self.keys]
+            self._key_positions = {normalize_text(key): position for position, key in enumerate(self.keys)}
+        else:
+            self.records = list(data)
+        logger.info(f"Loaded {len(self.records)} records for {self.name} from {self.path}")
+
+    def _schema_fields(self) -> Dict[str, str]:
+        """Field name -> type as declared by the schema"""
+        item_schema = self.schema.get("items")
+        if item_schema is None:
+            item_schema = next(iter(self.schema.get("patternProperties", {}).values()), {})
+        return {name: field_type(prop) for name, prop in item_schema.get("properties", {}).items()}
+
+    def _field_type(self, field: str) -> str:
+        declared = self.fields.get(field)
+        if declared:
+            return declared
+        return infer_field_type([record.get(field) for record in self.records[:50]])
+
+    def _equality_index(self, field: str) -> Dict[str, List[int]]:
+        index = self._equality_indexes.get(field)
+        if index is None:
+            with self._lock:
+                index, spellings = {}, {}
+                for position, record in enumerate(self.records):
+                    value = record.get(field)
+                    for item in value if isinstance(value, list) else [value]:
+                        key = normalize_text(item)
+                        if key is not None:
+                            index.setdefault(key, []).append(position)
+                            spellings.setdefault(key, item)
+                self._spellings[field] = spellings
+                self._equality_indexes[field] = index
+        return index
+
+    def _sort_key(self, field: str) -> Callable[[Any], Any]:
+        return SORT_KEYS.get(self._field_type(field), parse_number)
+
+    def _sorted_pairs(self, field: str, positions) -> Tuple[List[Any], List[int]]:
+        sort_key = self._sort_key(field)
+        pairs = []
+        for position in positions:
+            value = sort_key(self.records[position].get(field))
+            if value is not None:
+                pairs.append((value, position))
+        pairs.sort(key=lambda pair: pair[0])
+        return [value for value, _ in pairs], [position for _, position in pairs]
+
+    def _sorted_index(self, field: str) -> Tuple[List[Any], List[int]]:
+        index = self._sorted_indexes.get(field)
+        if index is None:
+            with self._lock:
+                index = self._sorted_pairs(field, range(len(self.records)))
+                self._sorted_indexes[field] = index
+        return index
+
+    def _grouped_index(self, field: str, group_by: str) -> Dict[str, Tuple[List[Any], List[int]]]:
+        index = self._grouped_indexes.get((field, group_by))
+        if index is None:
+            groups = self._equality_index(group_by)
+            with self._lock:
+                index = {group: self._sorted_pairs(field, positions) for group, positions in groups.items()}
+                self._grouped_indexes[(field, group_by)] = index
+        return index
+
+    def _matching_positions(self, filters: Dict[str, Any]) -> Optional[List[int]]:
+        """Positions matching every equality filter, None when no filter is set"""
+        matched = None
+        for field, wanted in filters.items():
+            if wanted is None or wanted == []:
+                continue
+            index = self._equality_index(field)
+            positions = set()
+            for value in wanted if isinstance(wanted, (list, tuple, set)) else [wanted]:
+                positions.update(index.get(normalize_text(value), []))
+            matched = positions if matched is None else matched & positions
+            if not matched:
+                return []
+        return sorted(matched) if matched is not None else None
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Record stored under a key of an object-shaped source, case-insensitive"""
+        position = self._key_positions.get(normalize_text(key))
+        return self.records[position] if position is not None else None
+
+    def all(self) -> List[Dict]:
+        return self.records
+
+    def where(self, **filters) -> List[Dict]:
+        """
+        Records whose fields equal the given values, case-insensitive. A list matches any of its values,
+        array fields match when they contain the value, and None or empty filters are ignored.
+        """
+        positions = self._matching_positions(filters)
+        if positions is None:
+            return self.records
+        return [self.records[position] for position in positions]
+
+    def distinct(self, field: str) -> List[Any]:
+        """Distinct values of a field, in the spelling of their first occurrence"""
+        self._equality_index(field)
+        return list(self._spellings[field].values())
+
+    def between(self, field: str, low: Any = None, high: Any = None, **filters) -> List[Dict]:
+        """Records with low <= field <= high (either bound optional) for number and date-time fields"""
+        sort_key = self._sort_key(field)
+        bounds = [sort_key(bound) if bound is not None else None for bound in (low, high)]
+        for bound, parsed in zip((low, high), bounds):
+            if bound is not None and parsed is None:
+                raise ValueError(f"Invalid bound {bound!r} for {self.name}.{field}")
+        values, positions = self._sorted_index(field)
+        start = bisect.bisect_left(values, bounds[0]) if low is not None else 0
+        end = bisect.bisect_right(values, bounds[1]) if high is not None else len(values)
+        selected = positions[start:end]
+
+        matched = self._matching_positions(filters)
+        if matched is not None:
+            allowed = set(matched)
+            selected = [position for position in selected if position in allowed]
+        return [self.records[position] for position in selected]
+
+    @staticmethod
+    def _closest(values: List[Any], positions: List[int], target: Any) -> Optional[int]:
+        if not values:
+            return None
+        i = bisect.bisect_left(values, target)
+        candidates = [j for j in (i - 1, i) if 0 <= j < len(values)]
+        return positions[min(candidates, key=lambda j: abs(values[j] - target))]
+
+    def nearest(self, field: str, target: Any = None, **filters) -> Optional[Dict]:
+        """
+        Record whose field is closest to target among those matching the filters.
+        For date-time fields target defaults to now and may be an ISO string.
+        """
+        sort_key = self._sort_key(field)
+        target = sort_key(target if target is not None else datetime.now())
+        if target is None:
+            return None
+        matched = self._matching_positions(filters)
+        if matched is None:
+            values, positions = self._sorted_index(field)
+        else:
+            values, positions = self._sorted_pairs(field, matched)
+        position = self._closest(values, positions, target)
+        return self.records[position] if position is not None else None
+
+    def nearest_per(self, field: str, group_by: str, target: Any = None, groups: Optional[List[Any]] = None) -> List[Dict]:
+        """
+        For every distinct value of group_by (or only those in groups), the record whose field is
+        closest to target, e.g. the reading nearest to a time for each location.
+        """
+        sort_key = self._sort_key(field)
+        target = sort_key(target if target is not None else datetime.now())
+        if target is None:
+            return []
+        index = self._grouped_index(field, group_by)
+        keys = [normalize_text(group) for group in groups] if groups else list(index.keys())
+        results = []
+        for key in keys:
+            if key in index:
+                position = self._closest(*index[key], target)
+                if position is not None:
+                    results.append(self.records[position])
+        return results
+
+
+def load_data_source_registry(path: Optional[str] = None) -> Dict[str, Dict]:
+    """Data source descriptions keyed by name"""
+    path = path or DATA_SOURCES_PATH
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return {source["name"]: source for source in json.load(f)}
+    except FileNotFoundError:
+        logger.error(f"Data source registry {path} not found")
+        return {}
+
+
+# Shared views, one per data source per process
+_data_sources: Dict[str, DataSource] = {}
+_registry: Optional[Dict[str, Dict]] = None
+_data_sources_lock = threading.Lock()
+
+
+def get_data_source(name: str) -> DataSource:
+    """Shared indexed view of a registered data source, loaded on first use"""
+    global _registry
+    data_source = _data_sources.get(name)
+    if data_source is None:
+        with _data_sources_lock:
+            data_source = _data_sources.get(name)
+            if data_source is None:
+                if _registry is None:
+                    _registry = load_data_source_registry()
+                info = _registry.get(name)
+                if info is None:
+                    raise ValueError(f"Unknown data source: {name}")
+                data_source = DataSource(name, info["path"], info.get("schema"))
+                _data_sources[name] = data_source
+    return data_source
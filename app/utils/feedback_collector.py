@@ -1,86 +1,185 @@
-import pandas as pd
+import atexit
+import csv
+import json
 import os
+import threading
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from app.utils.feedback_rollups import FeedbackRollups, split_services
 from app.utils.logger import setup_logger
 
 logger = setup_logger("FeedbackCollector")
 
+LIST_FIELDS = ["selected_services", "missing_services", "unnecessary_services"]
+
+
 class FeedbackCollector:
-    def __init__(self):
-        self.feedback_file = "data/user_feedback.csv"
+    """
+    Append-only JSONL feedback store.
+
+    Submissions are queued and a background thread appends them in batches, one O_APPEND write per
+    batch, so concurrent sessions and processes never overwrite each other's rows. Statistics come
+    from rollups that only read the lines appended since the last call.
+    """
+
+    def __init__(self, feedback_file: Optional[str] = None, flush_interval: Optional[float] = None):
+        self.feedback_file = feedback_file or os.getenv("FEEDBACK_FILE", "data/user_feedback.jsonl")
+        self.legacy_feedback_file = os.path.join(os.path.dirname(self.feedback_file), "user_feedback.csv")
+        self.flush_interval = flush_interval or float(os.getenv("FEEDBACK_FLUSH_INTERVAL", "0.5"))
+        self.rollups = FeedbackRollups(
+            os.getenv("FEEDBACK_ROLLUP_SNAPSHOT", os.path.splitext(self.feedback_file)[0] + "_rollups.json")
+        )
+
+        self._pending: List[str] = []
+        self._pending_lock = threading.Condition()
+        # Serializes file appends between the writer thread and explicit flushes
+        self._write_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
         self.ensure_feedback_file_exists()
+        self.rollups.load()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True, name="feedback-writer")
+        self._writer.start()
+        atexit.register(self.flush)
 
     def ensure_feedback_file_exists(self):
-        """Create feedback file with headers if it doesn't exist"""
-        if not os.path.exists("data"):
-            os.makedirs("data")
-            
-        if not os.path.exists(self.feedback_file):
-            headers = [
-                "timestamp",
-                "user_query",
-                "selected_services",
-                "accuracy_rating",
-                "relevance_rating",
-                "missing_services",
-                "unnecessary_services",
-                "additional_comments",
-                "would_use_again"
-            ]
-            pd.DataFrame(columns=headers).to_csv(self.feedback_file, index=False)
-            logger.info(f"Created new feedback file at {self.feedback_file}")
+        """Create the feedback file, importing rows from the legacy CSV file once"""
+        directory = os.path.dirname(self.feedback_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        if os.path.exists(self.feedback_file):
+            return
+        lines = []
+        if os.path.exists(self.legacy_feedback_file):
+            with open(self.legacy_feedback_file, "r", newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    lines.append(self._serialize(self._from_csv_row(row)))
+        self._append(lines)
+        logger.info(f"Created feedback file at {self.feedback_file} with {len(lines)} imported rows")
+
+    @staticmethod
+    def _from_csv_row(row: Dict[str, str]) -> Dict[str, Any]:
+        record = dict(row)
+        for key in LIST_FIELDS:
+            record[key] = split_services(row.get(key))
+        for key in ["accuracy_rating", "relevance_rating"]:
+            record[key] = int(float(row[key])) if row.get(key) else None
+        record["would_use_again"] = row.get("would_use_again") == "True"
+        return record
+
+    @staticmethod
+    def _serialize(feedback_data: Dict[str, Any]) -> str:
+        return json.dumps(feedback_data, ensure_ascii=False) + "\n"
+
+    def _append(self, lines: List[str]):
+        fd = os.open(self.feedback_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            # One write per batch: with O_APPEND the kernel places it at the end of the file atomically
+            os.write(fd, "".join(lines).encode("utf-8"))
+        finally:
+            os.close(fd)
+
+    def _write_loop(self):
+        while True:
+            with self._pending_lock:
+                while not self._pending:
+                    self._pending_lock.wait()
+                # Let a burst of submissions accumulate into one write
+                self._pending_lock.wait(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Write every queued submission now"""
+        with self._write_lock:
+            with self._pending_lock:
+                lines, self._pending = self._pending, []
+            if not lines:
+                return
+            try:
+                self._append(lines)
+            except OSError as e:
+                logger.error(f"Error writing {len(lines)} feedback rows: {str(e)}")
+                with self._pending_lock:
+                    self._pending = lines + self._pending
 
     def save_feedback(self, feedback_data: Dict[str, Any]):
-        """Save user feedback to CSV file"""
+        """Queue user feedback for the batched writer"""
         try:
-            feedback_data["timestamp"] = datetime.now().isoformat()
-            
-            # Convert lists to string representation
-            for key in ["selected_services", "missing_services", "unnecessary_services"]:
-                if key in feedback_data and isinstance(feedback_data[key], list):
-                    feedback_data[key] = ", ".join(feedback_data[key])
-
-            # Read existing data
-            df = pd.read_csv(self.feedback_file)
-            
-            # Append new feedback
-            new_df = pd.DataFrame([feedback_data])
-            df = pd.concat([df, new_df], ignore_index=True)
-            
-            # Save back to CSV
-            df.to_csv(self.feedback_file, index=False)
-            logger.info("Successfully saved user feedback")
+            record = dict(feedback_data)
+            record["timestamp"] = datetime.now().isoformat()
+            for key in LIST_FIELDS:
+                if key in record:
+                    record[key] = split_services(record[key])
+
+            line = self._serialize(record)
+            with self._pending_lock:
+                self._pending.append(line)
+                self._pending_lock.notify()
+            logger.info("Successfully queued user feedback")
             return True
         except Exception as e:
             logger.error(f"Error saving feedback: {str(e)}")
             return False
 
+    def _refresh(self):
+        """Fold the lines appended since the last refresh, by this or any other process, into the rollups"""
+        if not os.path.exists(self.feedback_file):
+            return
+        size = os.path.getsize(self.feedback_file)
+        if size == self.rollups.offset:
+            return
+        if size < self.rollups.offset:
+            # The file was replaced, start over
+            self.rollups.reset()
+        with open(self.feedback_file, "rb") as f:
+            f.seek(self.rollups.offset)
+            data = f.read()
+        # A line another process is still writing is picked up on the next refresh
+        complete = data[:data.rfind(b"\n") + 1]
+        if not complete:
+            return
+        for line in complete.splitlines():
+            if not line.strip():
+                continue
+            try:
+                self.rollups.add(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning("Skipping malformed feedback line")
+        self.rollups.offset += len(complete)
+        try:
+            self.rollups.save()
+        except OSError as e:
+            logger.warning(f"Could not save feedback rollups: {str(e)}")
+
     def get_feedback_stats(self) -> Dict[str, Any]:
         """Get basic statistics from collected feedback"""
         try:
-            df = pd.read_csv(self.feedback_file)
-            stats = {
-                "total_responses": len(df),
-                "average_accuracy": df["accuracy_rating"].mean(),
-                "average_relevance": df["relevance_rating"].mean(),
-                "would_use_again_percentage": (df["would_use_again"] == True).mean() * 100,
-                "most_common_missing_services": self._get_most_common_items(df, "missing_services"),
-                "most_common_unnecessary_services": self._get_most_common_items(df, "unnecessary_services")
-            }
-            return stats
+            self.flush()
+            with self._stats_lock:
+                self._refresh()
+                return dict(self.rollups.stats())
         except Exception as e:
             logger.error(f"Error calculating feedback stats: {str(e)}")
             return {}
 
-    def _get_most_common_items(self, df: pd.DataFrame, column: str, top_n: int = 5) -> List[str]:
-        """Helper function to get most common items from a comma-separated string column"""
-        try:
-            all_items = []
-            for items_str in df[column].dropna():
-                all_items.extend([item.strip() for item in items_str.split(",")])
-            
-            from collections import Counter
-            return [item for item, _ in Counter(all_items).most_common(top_n)]
-        except Exception:
-            return [] 
\ No newline at end of file
+    def get_feedback_timeseries(self, period: str = "daily", last: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Feedback stats per day or ISO week, oldest first"""
+        self.flush()
+        with self._stats_lock:
+            self._refresh()
+            return self.rollups.timeseries(period, last)
+
+
+# Global instance of FeedbackCollector, one writer thread per process
+_feedback_collector = None
+_feedback_collector_lock = threading.Lock()
+
+
+def get_feedback_collector():
+    global _feedback_collector
+    if _feedback_collector is None:
+        with _feedback_collector_lock:
+            if _feedback_collector is None:
+                _feedback_collector = FeedbackCollector()
+    return _feedback_collector
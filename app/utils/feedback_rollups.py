@@ -0,0 +1,162 @@
+import json
+import os
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+RATING_FIELDS = ["accuracy_rating", "relevance_rating"]
+COUNTED_FIELDS = ["selected_services", "missing_services", "unnecessary_services"]
+
+
+def split_services(value) -> List[str]:
+    """Service lists are stored as lists, older CSV rows joined them with commas"""
+    if isinstance(value, list):
+        return [item.strip() for item in value if item and item.strip()]
+    if not value:
+        return []
+    return [item.strip() for item in str(value).split(",") if item.strip()]
+
+
+def bucket_keys(timestamp: Optional[str]) -> Dict[str, str]:
+    """Daily (2024-12-08) and ISO weekly (2024-W49) bucket of a feedback timestamp"""
+    try:
+        moment = datetime.fromisoformat(timestamp)
+    except (TypeError, ValueError):
+        return {}
+    year, week, _ = moment.isocalendar()
+    return {"daily": moment.date().isoformat(), "weekly": f"{year}-W{week:02d}"}
+
+
+class FeedbackRollup:
+    """Running counts, rating means and service counters over a set of feedback records"""
+
+    def __init__(self):
+        self.total = 0
+        self.rating_sums = {field: 0.0 for field in RATING_FIELDS}
+        self.rating_counts = {field: 0 for field in RATING_FIELDS}
+        self.would_use_again = 0
+        self.counters = {field: Counter() for field in COUNTED_FIELDS}
+
+    def add(self, record: Dict[str, Any]):
+        self.total += 1
+        for field in RATING_FIELDS:
+            if record.get(field) is not None:
+                self.rating_sums[field] += record[field]
+                self.rating_counts[field] += 1
+        if record.get("would_use_again") is True:
+            self.would_use_again += 1
+        for field in COUNTED_FIELDS:
+            self.counters[field].update(split_services(record.get(field)))
+
+    def mean(self, field: str) -> Optional[float]:
+        return self.rating_sums[field] / self.rating_counts[field] if self.rating_counts[field] else None
+
+    def top(self, field: str, k: int = 5) -> List[str]:
+        return [item for item, _ in self.counters[field].most_common(k)]
+
+    def stats(self, top_k: int = 5) -> Dict[str, Any]:
+        return {
+            "total_responses": self.total,
+            "average_accuracy": self.mean("accuracy_rating"),
+            "average_relevance": self.mean("relevance_rating"),
+            "would_use_again_percentage": self.would_use_again / self.total * 100 if self.total else None,
+            "most_common_missing_services": self.top("missing_services", top_k),
+            "most_common_unnecessary_services": self.top("unnecessary_services", top_k)
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "rating_sums": self.rating_sums,
+            "rating_counts": self.rating_counts,
+            "would_use_again": self.would_use_again,
+            "counters": {field: dict(counter) for field, counter in self.counters.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FeedbackRollup":
+        rollup = cls()
+        rollup.total = data["total"]
+        rollup.rating_sums.update(data["rating_sums"])
+        rollup.rating_counts.update(data["rating_counts"])
+        rollup.would_use_again = data["would_use_again"]
+        for field, counts in data["counters"].items():
+            rollup.counters[field] = Counter(counts)
+        return rollup
+
+
+class FeedbackRollups:
+    """
+    Overall, daily and weekly rollups of the feedback file, updated on every inserted record.
+
+    A snapshot on disk records the rollups together with how many bytes of the feedback file they
+    cover, so a restart only reads the lines appended after the snapshot.
+    """
+
+    PERIODS = ["daily", "weekly"]
+
+    def __init__(self, snapshot_path: Optional[str] = None):
+        self.snapshot_path = snapshot_path
+        self.reset()
+
+    def reset(self):
+        self.offset = 0
+        self.overall = FeedbackRollup()
+        self.buckets: Dict[str, Dict[str, FeedbackRollup]] = {period: {} for period in self.PERIODS}
+        self._stats_cache = None
+
+    def add(self, record: Dict[str, Any]):
+        self.overall.add(record)
+        for period, key in bucket_keys(record.get("timestamp")).items():
+            self.buckets[period].setdefault(key, FeedbackRollup()).add(record)
+        self._stats_cache = None
+
+    def stats(self) -> Dict[str, Any]:
+        # Cached until the next insert, so repeated dashboard reads cost nothing
+        if self._stats_cache is None:
+            self._stats_cache = self.overall.stats()
+        return self._stats_cache
+
+    def timeseries(self, period: str = "daily", last: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Stats per bucket, oldest first, optionally only the last N buckets"""
+        if period not in self.buckets:
+            raise ValueError(f"Unknown rollup period: {period}")
+        keys = sorted(self.buckets[period])
+        if last:
+            keys = keys[-last:]
+        return [{"bucket": key, **self.buckets[period][key].stats()} for key in keys]
+
+    def load(self) -> bool:
+        """Restore the last snapshot, False if there is none or it is unreadable"""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        try:
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self.offset = snapshot["offset"]
+            self.overall = FeedbackRollup.from_dict(snapshot["overall"])
+            self.buckets = {
+                period: {key: FeedbackRollup.from_dict(data) for key, data in snapshot["buckets"].get(period, {}).items()}
+                for period in self.PERIODS
+            }
+            self._stats_cache = None
+            return True
+        except (OSError, ValueError, KeyError):
+            self.reset()
+            return False
+
+    def save(self):
+        if not self.snapshot_path:
+            return
+        snapshot = {
+            "offset": self.offset,
+            "overall": self.overall.to_dict(),
+            "buckets": {
+                period: {key: rollup.to_dict() for key, rollup in buckets.items()}
+                for period, buckets in self.buckets.items()
+            }
+        }
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.snapshot_path)
@@ -0,0 +1,78 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from app.utils.logger import setup_logger
+
+logger = setup_logger("GenerationJobs")
+
+
+class GenerationJobQueue:
+    """Runs app generation on background workers so builder sessions only submit a job and poll its status"""
+
+    def __init__(self, max_workers: Optional[int] = None, job_ttl: Optional[float] = None):
+        self.max_workers = max_workers or int(os.getenv("APP_GENERATION_WORKERS", "4"))
+        # Finished jobs are kept this long so sessions can still read their result
+        self.job_ttl = job_ttl or float(os.getenv("APP_GENERATION_JOB_TTL", "3600"))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="app-generation")
+        self.jobs: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, app_generator, selected_services: List[str], parameters: Dict) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._prune()
+            self.jobs[job_id] = {
+                "job_id": job_id,
+                "status": "queued",
+                "services": selected_services,
+                "app_url": None,
+                "error": None,
+                "created_at": time.time(),
+                "finished_at": None
+            }
+        self.executor.submit(self._run, job_id, app_generator, selected_services, parameters)
+        logger.info(f"Queued generation job {job_id} for services: {selected_services}")
+        return job_id
+
+    def _run(self, job_id: str, app_generator, selected_services: List[str], parameters: Dict):
+        self._update(job_id, status="running")
+        try:
+            app_url = app_generator.generate_app(selected_services, parameters)
+            self._update(job_id, status="done", app_url=app_url, finished_at=time.time())
+            logger.info(f"Generation job {job_id} finished: {app_url}")
+        except Exception as e:
+            logger.error(f"Generation job {job_id} failed: {str(e)}", exc_info=True)
+            self._update(job_id, status="failed", error=str(e), finished_at=time.time())
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            if job_id in self.jobs:
+                self.jobs[job_id].update(fields)
+
+    def _prune(self):
+        cutoff = time.time() - self.job_ttl
+        for job_id in [key for key, job in self.jobs.items() if job["finished_at"] and job["finished_at"] < cutoff]:
+            del self.jobs[job_id]
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Snapshot of a job's status, safe to read while the worker updates it"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+
+# Global instance of GenerationJobQueue, shared by every builder session
+_generation_queue = None
+_generation_queue_lock = threading.Lock()
+
+
+def get_generation_queue():
+    global _generation_queue
+    if _generation_queue is None:
+        with _generation_queue_lock:
+            if _generation_queue is None:
+                _generation_queue = GenerationJobQueue()
+    return _generation_queue
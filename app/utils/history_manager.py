@@ -0,0 +1,155 @@
+import os
+from typing import Awaitable, Callable, Dict, List, Optional
+from app.utils.logger import setup_logger
+
+logger = setup_logger("HistoryManager")
+
+SUMMARY_PROMPT = """You are maintaining a running summary of a conversation between a tourist and a Hyderabad City Guide.
+
+Current summary:
+{summary}
+
+New conversation turns to fold into the summary:
+{turns}
+
+Rewrite the summary so it covers everything above in at most {max_words} words.
+Keep every preference, place, time constraint and choice the tourist explicitly stated or confirmed.
+Drop greetings and small talk. Return ONLY the updated summary."""
+
+
+def message_role(message) -> str:
+    """Return the role of a langchain message or its serialized dict form"""
+    if isinstance(message, dict):
+        role = message.get("role") or message.get("type", "")
+    else:
+        role = getattr(message, "type", "")
+    return {"human": "user", "ai": "assistant"}.get(role, role)
+
+
+def message_content(message) -> str:
+    """Return the text of a langchain message or its serialized dict form"""
+    if isinstance(message, dict):
+        return str(message.get("content", ""))
+    return message.content if hasattr(message, "content") else str(message)
+
+
+class TokenCounter:
+    def __init__(self, model_name: Optional[str] = None):
+        self.model_name = model_name
+        self._encoding = None
+        self._loaded = False
+
+    @property
+    def encoding(self):
+        # tiktoken and its BPE files are loaded on first use rather than at service startup
+        if not self._loaded:
+            self._loaded = True
+            try:
+                import tiktoken
+                try:
+                    self._encoding = tiktoken.encoding_for_model(self.model_name or "gpt-4")
+                except KeyError:
+                    self._encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                # tiktoken downloads its BPE files on first use, fall back to an estimate offline
+                logger.warning(f"tiktoken unavailable, estimating token counts: {str(e)}")
+        return self._encoding
+
+    def count(self, text: str) -> int:
+        if self.encoding is None:
+            return len(text) // 4 + 1
+        return len(self.encoding.encode(text))
+
+    def count_message(self, message) -> int:
+        # Every chat message carries a few tokens of role/framing overhead
+        return self.count(message_content(message)) + 4
+
+
+class ConversationHistoryManager:
+    """Keeps the system prompt and recent turns verbatim and folds older turns into a rolling summary"""
+
+    def __init__(
+        self,
+        summarize: Callable[[str], Awaitable[str]],
+        token_budget: Optional[int] = None,
+        recent_messages: Optional[int] = None,
+        summary_batch_tokens: Optional[int] = None,
+        summary_max_words: int = 150,
+        model_name: Optional[str] = None
+    ):
+        self.summarize = summarize
+        self.token_budget = token_budget or int(os.getenv("HISTORY_TOKEN_BUDGET", "3000"))
+        self.recent_messages = recent_messages or int(os.getenv("HISTORY_RECENT_MESSAGES", "6"))
+        self.summary_batch_tokens = summary_batch_tokens or int(os.getenv("HISTORY_SUMMARY_BATCH_TOKENS", "800"))
+        self.summary_max_words = summary_max_words
+        self.counter = TokenCounter(model_name or os.getenv("OPENAI_MODEL"))
+
+    def _split(self, history: List) -> tuple:
+        if history and message_role(history[0]) == "system":
+            return history[:1], history[1:]
+        return [], history
+
+    def summary_message(self, conversation_state: Dict) -> Optional[Dict]:
+        summary = conversation_state.get("history_summary")
+        if not summary:
+            return None
+        return {"role": "system", "content": f"Summary of the earlier conversation: {summary}"}
+
+    def count_tokens(self, conversation_state: Dict) -> int:
+        messages = conversation_state["conversation_history"]
+        total = sum(self.counter.count_message(msg) for msg in messages)
+        summary = self.summary_message(conversation_state)
+        if summary:
+            total += self.counter.count_message(summary)
+        return total
+
+    async def compact(self, conversation_state: Dict) -> bool:
+        """Fold the oldest turns into the summary once the history exceeds its token budget"""
+        total = self.count_tokens(conversation_state)
+        if total <= self.token_budget:
+            return False
+
+        system, turns = self._split(conversation_state["conversation_history"])
+        candidates = turns[:-self.recent_messages] if len(turns) > self.recent_messages else []
+        if not candidates:
+            return False
+
+        # Evict at least a full batch so the summary is only recomputed every few turns
+        target = max(total - self.token_budget, self.summary_batch_tokens)
+        evicted, freed = [], 0
+        for msg in candidates:
+            if freed >= target:
+                break
+            evicted.append(msg)
+            freed += self.counter.count_message(msg)
+
+        turns_text = "\n".join(
+            f"{message_role(msg).capitalize()}: {message_content(msg)}" for msg in evicted
+        )
+        prompt = SUMMARY_PROMPT.format(
+            summary=conversation_state.get("history_summary") or "(empty)",
+            turns=turns_text,
+            max_words=self.summary_max_words
+        )
+
+        try:
+            summary = (await self.summarize(prompt)).strip()
+        except Exception as e:
+            logger.error(f"Error summarizing conversation history: {str(e)}")
+            return False
+
+        conversation_state["history_summary"] = summary
+        conversation_state["summarized_messages"] = conversation_state.get("summarized_messages", 0) + len(evicted)
+        conversation_state["conversation_history"] = system + turns[len(evicted):]
+        logger.info(f"Folded {len(evicted)} messages ({freed} tokens) into the conversation summary")
+        return True
+
+    def build_messages(self, conversation_state: Dict) -> List:
+        """Messages to send to the LLM: system prompt, rolling summary, then recent turns"""
+        system, turns = self._split(conversation_state["conversation_history"])
+        summary = self.summary_message(conversation_state)
+        return system + ([summary] if summary else []) + turns
+
+    def context_texts(self, conversation_state: Dict) -> List[str]:
+        """Plain-text view of the compacted conversation for extraction prompts"""
+        return [message_content(msg) for msg in self.build_messages(conversation_state)]
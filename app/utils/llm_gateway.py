@@ -0,0 +1,394 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from app.utils.logger import setup_logger
+from app.utils.llm_metrics import get_llm_metrics
+from app.utils.history_manager import message_role, message_content
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = setup_logger("LLMGateway")
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMGatewayError(Exception):
+    pass
+
+
+class LLMProviderError(LLMGatewayError):
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        # No status code means the request never got a response (connect/read failure)
+        return self.status_code is None or self.status_code in RETRYABLE_STATUS_CODES
+
+
+def _parse_retry_after(headers) -> Optional[float]:
+    """Read the provider's back-off hint from Retry-After style headers"""
+    if headers is None:
+        return None
+    for header in ("retry-after-ms", "retry-after"):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            seconds = float(value)
+        except ValueError:
+            continue
+        return seconds / 1000 if header == "retry-after-ms" else seconds
+    return None
+
+
+def normalize_messages(messages) -> List[Dict[str, str]]:
+    """Convert langchain messages, serialized dicts or a bare prompt into role/content dicts"""
+    if isinstance(messages, str):
+        return [{"role": "user", "content": messages}]
+    return [{"role": message_role(msg) or "user", "content": message_content(msg)} for msg in messages]
+
+
+def prompt_hash(messages: List[Dict[str, str]], **options) -> str:
+    """Stable key for a request, used to record and replay completions"""
+    key = {"messages": messages, "json_schema": options.get("json_schema")}
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for providers that don't report usage, about four characters per token"""
+    return max(1, len(text) // 4) if text else 0
+
+
+def load_recordings(path: str) -> Dict[str, str]:
+    recordings = {}
+    if not os.path.exists(path):
+        return recordings
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                recordings[record["prompt_hash"]] = record["completion"]
+    return recordings
+
+
+class OpenAIProvider:
+    name = "openai"
+
+    @staticmethod
+    def check_config():
+        if not os.getenv("OPENAI_API_KEY"):
+            raise ValueError("OpenAI API key not found")
+
+    def __init__(self, client: "httpx.AsyncClient"):
+        self.check_config()
+        api_key = os.getenv("OPENAI_API_KEY")
+
+        # The SDK is only imported when OpenAI is the selected provider
+        from openai import AsyncOpenAI
+
+        self.model = os.getenv("OPENAI_MODEL", "gpt-4")
+        self.temperature = float(os.getenv("OPENAI_TEMPERATURE", "0.7"))
+        # Retries are handled by the gateway so they share its deadline and jitter
+        self.client = AsyncOpenAI(api_key=api_key, http_client=client, max_retries=0)
+
+    async def complete(self, messages: List[Dict[str, str]], **options) -> Tuple[str, Dict]:
+        import openai
+
+        request = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": options.get("temperature", self.temperature)
+        }
+        if options.get("json_schema"):
+            request["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "structured_output", "schema": options["json_schema"]}
+            }
+        try:
+            response = await self.client.chat.completions.create(**request)
+        except openai.APIStatusError as e:
+            raise LLMProviderError(str(e), e.status_code, _parse_retry_after(e.response.headers))
+        except openai.APIConnectionError as e:
+            raise LLMProviderError(str(e))
+        usage = {}
+        if response.usage is not None:
+            usage = {
+                "prompt_tokens": response.usage.prompt_tokens,
+                "completion_tokens": response.usage.completion_tokens
+            }
+        return response.choices[0].message.content or "", usage
+
+
+class OllamaProvider:
+    name = "ollama"
+
+    @staticmethod
+    def check_config():
+        pass
+
+    def __init__(self, client: "httpx.AsyncClient"):
+        self.client = client
+        self.base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434").rstrip("/")
+        self.model = os.getenv("OLLAMA_MODEL", "llama3.2")
+        self.temperature = float(os.getenv("OLLAMA_TEMPERATURE", "0.7"))
+
+    async def complete(self, messages: List[Dict[str, str]], **options) -> Tuple[str, Dict]:
+        import httpx
+
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "stream": False,
+            "options": {"temperature": options.get("temperature", self.temperature)}
+        }
+        if options.get("json_schema"):
+            payload["format"] = options["json_schema"]
+        try:
+            response = await self.client.post(f"{self.base_url}/api/chat", json=payload)
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            raise LLMProviderError(str(e), e.response.status_code, _parse_retry_after(e.response.headers))
+        except httpx.TransportError as e:
+            raise LLMProviderError(f"{type(e).__name__}: {str(e)}")
+        body = response.json()
+        usage = {
+            "prompt_tokens": body.get("prompt_eval_count"),
+            "completion_tokens": body.get("eval_count")
+        }
+        return body["message"]["content"], usage
+
+
+class FakeProvider:
+    """Deterministic offline stand-in that replays recorded completions with simulated latency"""
+    name = "fake"
+
+    @staticmethod
+    def check_config():
+        pass
+
+    def __init__(self, client: "httpx.AsyncClient"):
+        self.recordings_path = os.getenv("LLM_FAKE_RECORDINGS", "data/llm_recordings.jsonl")
+        self.recordings = load_recordings(self.recordings_path)
+        self.latency = float(os.getenv("LLM_FAKE_LATENCY_MS", "200")) / 1000
+        self.token_delay = float(os.getenv("LLM_FAKE_TOKEN_DELAY_MS", "5")) / 1000
+        self.completion_tokens = int(os.getenv("LLM_FAKE_COMPLETION_TOKENS", "60"))
+        logger.info(f"Loaded {len(self.recordings)} recorded completions from {self.recordings_path}")
+
+    def _synthesize(self, key: str, json_schema: Optional[Dict]) -> str:
+        rng = random.Random(key)
+        if json_schema:
+            # Pick one service and value so the extraction path is exercised end to end
+            services = json_schema["properties"]["services"]["properties"]
+            candidates = [(s, p) for s, props in services.items() for p in props.get("properties", {}).items()]
+            if not candidates:
+                return json.dumps({"services": {}})
+            service, (param, param_schema) = rng.choice(sorted(candidates, key=lambda c: (c[0], c[1][0])))
+            return json.dumps({"services": {service: {param: [rng.choice(param_schema["items"]["enum"])]}}})
+        words = ["Hyderabad", "offers", "plenty", "to", "explore", "from", "lakes", "and", "forts",
+                 "to", "markets", "and", "biryani", "what", "interests", "you", "most", "today"]
+        return " ".join(rng.choice(words) for _ in range(self.completion_tokens)) + "?"
+
+    def _completion(self, messages: List[Dict[str, str]], **options) -> Tuple[str, bool]:
+        """The recorded completion if there is one, a synthesized one otherwise"""
+        key = prompt_hash(messages, **options)
+        completion = self.recordings.get(key)
+        if completion is None:
+            return self._synthesize(key, options.get("json_schema")), False
+        return completion, True
+
+    async def stream(self, messages: List[Dict[str, str]], **options):
+        completion, _ = self._completion(messages, **options)
+        async for token in self._replay(completion):
+            yield token
+
+    async def _replay(self, completion: str):
+        await asyncio.sleep(self.latency)
+        tokens = completion.split(" ")
+        for idx, token in enumerate(tokens):
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            yield token if idx == len(tokens) - 1 else token + " "
+
+    async def complete(self, messages: List[Dict[str, str]], **options) -> Tuple[str, Dict]:
+        start = time.perf_counter()
+        ttft_ms = None
+        tokens = []
+        completion, cached = self._completion(messages, **options)
+        async for token in self._replay(completion):
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - start) * 1000
+            tokens.append(token)
+        completion = "".join(tokens)
+        usage = {
+            "prompt_tokens": sum(estimate_tokens(m["content"]) for m in messages),
+            "completion_tokens": len(tokens),
+            "ttft_ms": ttft_ms,
+            # A replayed recording stands in for a cache hit
+            "cached": cached
+        }
+        return completion, usage
+
+
+PROVIDERS = {
+    "openai": OpenAIProvider,
+    "ollama": OllamaProvider,
+    "fake": FakeProvider,
+}
+
+
+class LLMGateway:
+    """Async LLM client with a pooled HTTP connection, per-provider concurrency limit, retries and deadlines"""
+
+    # One semaphore per provider, shared by every gateway in the process
+    _semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def __init__(
+        self,
+        provider: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        deadline: Optional[float] = None
+    ):
+        self.provider_name = (provider or os.getenv("LLM_PROVIDER", "openai")).lower()
+        if self.provider_name not in PROVIDERS:
+            raise ValueError(f"Unknown LLM provider: {self.provider_name}")
+
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("LLM_MAX_RETRIES", "3"))
+        self.deadline = deadline or float(os.getenv("LLM_REQUEST_DEADLINE", "45"))
+        self.backoff_base = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+        self.backoff_cap = float(os.getenv("LLM_BACKOFF_CAP", "8"))
+        # Completions from real providers can be recorded here and replayed with LLM_PROVIDER=fake
+        self.record_path = os.getenv("LLM_RECORD_PATH")
+        self.metrics = get_llm_metrics()
+
+        # Fail fast on missing configuration, but defer SDK imports and the HTTP pool to the first call
+        PROVIDERS[self.provider_name].check_config()
+        self.client = None
+        self._provider = None
+        logger.info(
+            f"Configured {self.provider_name} gateway (concurrency={self.max_concurrency}, "
+            f"retries={self.max_retries}, deadline={self.deadline}s)"
+        )
+
+    @property
+    def provider(self):
+        if self._provider is None:
+            import httpx
+
+            self.client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.deadline, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency * 2,
+                    max_keepalive_connections=self.max_concurrency,
+                    keepalive_expiry=60
+                )
+            )
+            self._provider = PROVIDERS[self.provider_name](self.client)
+            logger.info(f"Initialized {self.provider_name} provider")
+        return self._provider
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self.provider_name not in self._semaphores:
+            self._semaphores[self.provider_name] = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphores[self.provider_name]
+
+    def _backoff(self, attempt: int, error: LLMProviderError) -> float:
+        if error.retry_after is not None:
+            # Honour the provider's hint, with a little jitter so waiting callers don't stampede
+            return error.retry_after + random.uniform(0, self.backoff_base)
+        # Full jitter exponential back-off
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    async def _call(self, messages: List[Dict[str, str]], **options) -> Tuple[str, Dict]:
+        async with self.semaphore:
+            completion, usage = await self.provider.complete(messages, **options)
+        if self.record_path and self.provider_name != "fake":
+            self._record(messages, completion, **options)
+        return completion, usage
+
+    def _record(self, messages: List[Dict[str, str]], completion: str, **options):
+        record = {"prompt_hash": prompt_hash(messages, **options), "completion": completion}
+        try:
+            with open(self.record_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not record completion to {self.record_path}: {str(e)}")
+
+    async def complete(self, messages, deadline: Optional[float] = None, stage: str = "chat", **options) -> str:
+        """
+        Send a chat completion, retrying transient failures until the request deadline.
+        Tokens, latency and outcome are recorded under the given pipeline stage.
+        """
+        messages = normalize_messages(messages)
+        start = time.perf_counter()
+        usage, error = {}, None
+        # Updated by the retry loop, so failed calls record how many retries they went through too
+        progress = {"retries": 0}
+        try:
+            completion, usage = await self._complete_with_retries(messages, deadline, progress, **options)
+            return completion
+        except Exception as e:
+            error = f"{type(e).__name__}: {str(e)}"
+            raise
+        finally:
+            self.metrics.record(
+                stage,
+                provider=self.provider_name,
+                model=getattr(self._provider, "model", None),
+                prompt_tokens=usage.get("prompt_tokens"),
+                completion_tokens=usage.get("completion_tokens"),
+                latency_ms=(time.perf_counter() - start) * 1000,
+                ttft_ms=usage.get("ttft_ms"),
+                cached=usage.get("cached", False),
+                error=error,
+                retries=progress["retries"]
+            )
+
+    async def _complete_with_retries(
+        self,
+        messages: List[Dict[str, str]],
+        deadline: Optional[float] = None,
+        progress: Optional[Dict] = None,
+        **options
+    ) -> Tuple[str, Dict]:
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + (deadline or self.deadline)
+        progress = progress if progress is not None else {}
+        attempt = progress["retries"] = 0
+
+        while True:
+            remaining = deadline_at - loop.time()
+            if remaining <= 0:
+                raise LLMGatewayError(f"LLM request exceeded its {deadline or self.deadline}s deadline")
+            try:
+                completion, usage = await asyncio.wait_for(self._call(messages, **options), timeout=remaining)
+                return completion, usage
+            except asyncio.TimeoutError:
+                raise LLMGatewayError(f"LLM request exceeded its {deadline or self.deadline}s deadline")
+            except LLMProviderError as e:
+                if not e.retryable or attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt, e)
+                if delay >= deadline_at - loop.time():
+                    raise
+                attempt += 1
+                progress["retries"] = attempt
+                logger.warning(
+                    f"{self.provider_name} request failed ({e.status_code or 'no response'}), "
+                    f"retry {attempt}/{self.max_retries} in {delay:.2f}s"
+                )
+                await asyncio.sleep(delay)
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
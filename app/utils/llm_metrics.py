@@ -0,0 +1,120 @@
+import json
+import math
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from app.utils.logger import setup_logger
+
+logger = setup_logger("LLMMetrics")
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(pct / 100 * len(ordered))) - 1]
+
+
+def summarize_records(records: Iterable[Dict]) -> Dict[str, Dict]:
+    """Aggregate LLM call records per stage: calls, errors, cache hits, tokens and latency percentiles"""
+    stages = {}
+    for record in records:
+        stage = stages.setdefault(record.get("stage") or "unknown", {
+            "calls": 0, "errors": 0, "cache_hits": 0,
+            "prompt_tokens": 0, "completion_tokens": 0,
+            "latencies": [], "ttfts": []
+        })
+        stage["calls"] += 1
+        stage["errors"] += 1 if record.get("error") else 0
+        stage["cache_hits"] += 1 if record.get("cached") else 0
+        stage["prompt_tokens"] += record.get("prompt_tokens") or 0
+        stage["completion_tokens"] += record.get("completion_tokens") or 0
+        if record.get("latency_ms") is not None:
+            stage["latencies"].append(record["latency_ms"])
+        if record.get("ttft_ms") is not None:
+            stage["ttfts"].append(record["ttft_ms"])
+
+    summary = {}
+    for name, stage in stages.items():
+        latencies, ttfts = stage.pop("latencies"), stage.pop("ttfts")
+        summary[name] = {
+            **stage,
+            "cache_hit_rate": stage["cache_hits"] / stage["calls"],
+            "latency_ms": {
+                "total": round(sum(latencies), 1),
+                "p50": _percentile(latencies, 50),
+                "p95": _percentile(latencies, 95)
+            },
+            "ttft_ms_p50": _percentile(ttfts, 50)
+        }
+    return summary
+
+
+class LLMMetrics:
+    """Records one structured entry per LLM call, appended to a JSONL file and kept in memory for aggregates"""
+
+    def __init__(self, path: Optional[str] = None, component: str = "chatbot_llm", max_records: int = 10000):
+        path = path if path is not None else os.getenv("LLM_METRICS_PATH", "")
+        # Without LLM_METRICS_PATH metrics are kept in memory only
+        self.path = path or None
+        self.component = component
+        self.max_records = max_records
+        self.records: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        stage: str,
+        provider: Optional[str] = None,
+        model: Optional[str] = None,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        latency_ms: Optional[float] = None,
+        ttft_ms: Optional[float] = None,
+        cached: bool = False,
+        error: Optional[str] = None,
+        **extra
+    ):
+        entry = {
+            "timestamp": datetime.now().isoformat(),
+            "component": self.component,
+            "stage": stage,
+            "provider": provider,
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "latency_ms": round(latency_ms, 1) if latency_ms is not None else None,
+            "ttft_ms": round(ttft_ms, 1) if ttft_ms is not None else None,
+            "cached": cached,
+            "error": error,
+            **extra
+        }
+        with self._lock:
+            self.records.append(entry)
+            if len(self.records) > self.max_records:
+                # Aggregates cover the most recent calls, the file keeps the full history
+                del self.records[:len(self.records) - self.max_records]
+            if self.path:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(entry) + "\n")
+                except OSError as e:
+                    logger.warning(f"Could not write LLM metrics to {self.path}: {str(e)}")
+
+    def summary(self) -> Dict[str, Dict]:
+        with self._lock:
+            records = list(self.records)
+        return summarize_records(records)
+
+
+# Global instance of LLMMetrics
+_llm_metrics = None
+
+
+def get_llm_metrics():
+    global _llm_metrics
+    if _llm_metrics is None:
+        _llm_metrics = LLMMetrics()
+    return _llm_metrics
@@ -0,0 +1,225 @@
+import re
+import threading
+from urllib.parse import quote
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.utils.logger import setup_logger
+
+logger = setup_logger("ParamAdapters")
+
+NUMBER_PATTERN = re.compile(r"-?\d+(?:\.\d+)?")
+
+# An adapter maps chatbot parameters to (request, problems that would make the service reject it), where the
+# request is {"path", "query", "body"} for the service's POST route. Parameters that can't be mapped are dropped
+# with a warning, the service would reject the whole request otherwise
+Adapter = Callable[[Dict[str, Any]], Tuple[Dict[str, Any], List[str]]]
+
+
+def _normalize_name(name: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+def _resolve_ref(schema: Dict, openapi: Dict) -> Dict:
+    while "$ref" in schema:
+        # Local refs only, e.g. "#/components/schemas/RestaurantFinderParams"
+        node = openapi
+        for part in schema["$ref"].lstrip("#/").split("/"):
+            node = node[part]
+        schema = node
+    return schema
+
+
+def find_post_route(openapi: Dict, service_name: str) -> Optional[str]:
+    """Path of the POST route serving a service: /{name}, /{name}/, or the service's only POST route"""
+    paths = [path for path, operations in openapi.get("paths", {}).items() if "post" in operations]
+    for candidate in (f"/{service_name}", f"/{service_name}/"):
+        if candidate in paths:
+            return candidate
+    matches = [path for path in paths if _normalize_name(path) == _normalize_name(service_name)]
+    if len(matches) == 1:
+        return matches[0]
+    return paths[0] if len(paths) == 1 else None
+
+
+def request_fields(openapi: Dict, path: str) -> Dict[str, Dict]:
+    """
+    Every input of a POST route: name -> {"in", "type", "required"}, where "in" is "body" for a field of a
+    JSON object body, "body_value" for a body that is a single value (e.g. a list), "query" or "path"
+    """
+    operation = openapi["paths"][path]["post"]
+    fields = {}
+    request_body = operation.get("requestBody", {})
+    body_schema = request_body.get("content", {}).get("application/json", {}).get("schema")
+    if body_schema:
+        model = _resolve_ref(body_schema, openapi)
+        if "properties" in model:
+            required = set(model.get("required", []))
+            for name, schema in model["properties"].items():
+                fields[name] = {"in": "body", "type": _field_type(schema, openapi), "required": name in required}
+        else:
+            # FastAPI names a lone non-model body parameter only through its schema title, e.g. "Locations"
+            name = re.sub(r"\W+", "_", model.get("title", "body")).strip("_").lower()
+            fields[name] = {
+                "in": "body_value",
+                "type": _field_type(body_schema, openapi),
+                "required": request_body.get("required", False)
+            }
+    for parameter in operation.get("parameters", []):
+        if parameter.get("in") in ("query", "path"):
+            fields[parameter["name"]] = {
+                "in": parameter["in"],
+                "type": _field_type(parameter.get("schema", {}), openapi),
+                "required": parameter.get("required", False)
+            }
+    return fields
+
+
+def _field_type(schema: Dict, openapi: Dict) -> Tuple[str, Optional[str]]:
+    """(type, item type) of a field, looking through Optional[...] (anyOf with null)"""
+    schema = _resolve_ref(schema, openapi)
+    if "anyOf" in schema:
+        options = [_resolve_ref(option, openapi) for option in schema["anyOf"]]
+        options = [option for option in options if option.get("type") != "null"]
+        schema = options[0] if options else {}
+    field_type = schema.get("type", "string")
+    item_type = None
+    if field_type == "array":
+        item_type = _resolve_ref(schema.get("items", {}), openapi).get("type", "string")
+    return field_type, item_type
+
+
+def _coerce_scalar(value: Any, target: str) -> Any:
+    if target == "integer" or target == "number":
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return int(value) if target == "integer" else value
+        # Chatbot values are strings such as "1000" or "4 hours"
+        match = NUMBER_PATTERN.search(str(value))
+        if match is None:
+            raise ValueError(f"{value!r} is not a number")
+        number = float(match.group())
+        return int(number) if target == "integer" else number
+    if target == "boolean":
+        if isinstance(value, bool):
+            return value
+        lowered = str(value).strip().lower()
+        if lowered in ("true", "yes", "y", "1"):
+            return True
+        if lowered in ("false", "no", "n", "0"):
+            return False
+        raise ValueError(f"{value!r} is not a boolean")
+    return value if isinstance(value, str) else str(value)
+
+
+def compile_adapter(path: str, fields: Dict[str, Dict]) -> Adapter:
+    """Precompute the field plan of a POST route once and return a function applying it"""
+    by_normalized = {_normalize_name(name): name for name in fields}
+    required = {name for name, field in fields.items() if field["required"]}
+    body_is_object = any(field["in"] == "body" for field in fields.values())
+
+    def adapt(params: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        values_by_field, errors = {}, []
+        for name, value in params.items():
+            field = name if name in fields else by_normalized.get(_normalize_name(name))
+            if field is None:
+                logger.warning(f"Dropping unknown parameter {name!r}")
+                continue
+            values = value if isinstance(value, list) else [value]
+            values = [v for v in values if v is not None and v != ""]
+            if not values:
+                continue
+
+            field_type, item_type = fields[field]["type"]
+            try:
+                if field_type == "array":
+                    values_by_field[field] = [_coerce_scalar(v, item_type) for v in values]
+                else:
+                    if len(values) > 1:
+                        logger.warning(f"{field} takes a single value, using {values[0]!r} of {values}")
+                    values_by_field[field] = _coerce_scalar(values[0], field_type)
+            except ValueError as e:
+                logger.warning(f"Dropping invalid value for {field}: {str(e)}")
+
+        missing = sorted(required - values_by_field.keys())
+        if missing:
+            errors.append(f"Missing required parameters: {', '.join(missing)}")
+
+        request = {"path": path, "query": {}, "body": {} if body_is_object else None}
+        for field, value in values_by_field.items():
+            location = fields[field]["in"]
+            if location == "body":
+                request["body"][field] = value
+            elif location == "body_value":
+                request["body"] = value
+            elif location == "query":
+                request["query"][field] = value
+            else:
+                request["path"] = request["path"].replace(f"{{{field}}}", quote(str(value), safe=""))
+        return request, errors
+
+    return adapt
+
+
+def passthrough_adapter(service_name: str) -> Adapter:
+    """Sends the parameters as they are, as the JSON body of POST /{service_name}"""
+
+    def adapt(params: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        body = {k: v for k, v in params.items() if v is not None}
+        return {"path": f"/{service_name}", "query": {}, "body": body}, []
+
+    return adapt
+
+
+class ParamAdapterRegistry:
+    """Builds one adapter per service from its OpenAPI spec, fetched once per service port"""
+
+    def __init__(self, timeout: float = 2.0):
+        self.timeout = timeout
+        self.adapters: Dict[Tuple[str, int], Adapter] = {}
+        self._lock = threading.Lock()
+
+    def _load_adapter(self, service_name: str, port: int) -> Optional[Adapter]:
+        import requests
+
+        try:
+            response = requests.get(f"http://localhost:{port}/openapi.json", timeout=self.timeout)
+            response.raise_for_status()
+            openapi = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.warning(f"OpenAPI spec of {service_name} unavailable, passing parameters through: {str(e)}")
+            return None
+
+        path = find_post_route(openapi, service_name)
+        if path is None:
+            logger.warning(f"No POST route for {service_name} in its OpenAPI spec")
+            return None
+        logger.info(f"Compiled parameter adapter for {service_name} from POST {path}")
+        return compile_adapter(path, request_fields(openapi, path))
+
+    def get_adapter(self, service_name: str, port: Optional[int]) -> Adapter:
+        if port is None:
+            return passthrough_adapter(service_name)
+        key = (service_name, port)
+        with self._lock:
+            if key not in self.adapters:
+                adapter = self._load_adapter(service_name, port)
+                if adapter is None:
+                    # Not cached, so the spec is fetched again once the service is up
+                    return passthrough_adapter(service_name)
+                self.adapters[key] = adapter
+            return self.adapters[key]
+
+    def adapt(self, service_name: str, port: Optional[int], params: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        return self.get_adapter(service_name, port)(params)
+
+
+# Global instance of ParamAdapterRegistry
+_param_adapters = None
+_param_adapters_lock = threading.Lock()
+
+
+def get_param_adapters():
+    global _param_adapters
+    if _param_adapters is None:
+        with _param_adapters_lock:
+            if _param_adapters is None:
+                _param_adapters = ParamAdapterRegistry()
+    return _param_adapters
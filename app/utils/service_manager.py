@@ -3,12 +3,28 @@ import json
 import psutil
 import subprocess
 import signal
+import requests
 from typing import Dict, Optional, List
 from app.utils.logger import setup_logger
 from app.utils.port_manager import get_port_manager
 
 logger = setup_logger("ServiceManager")
 
+# Run services inside app.service_host, which can switch versions in place instead of restarting
+HOT_RELOAD = os.getenv("SERVICE_HOT_RELOAD", "false").lower() == "true"
+
+
+def service_module_path(service_name: str, version: str = "original") -> Optional[str]:
+    """Get the correct import path for a service version"""
+    if version == "original":
+        if os.path.exists(f"app/microservices/{service_name}/service.py"):
+            return f"app.microservices.{service_name}.service"
+    elif version == "generated":
+        if os.path.exists(f"app/generated_services/{service_name}/service.py"):
+            return f"app.generated_services.{service_name}.service"
+    return None
+
+
 class ServiceManager:
     def __init__(self):
         self.port_manager = get_port_manager()
@@ -68,7 +84,10 @@ class ServiceManager:
                 return {"success": False, "message": f"{version} version of {service_name} not found"}
 
             # Start the service using Python
-            cmd = ["python", "-m", service_path]
+            if HOT_RELOAD:
+                cmd = ["python", "-m", "app.service_host", service_name, version]
+            else:
+                cmd = ["python", "-m", service_path]
             process = subprocess.Popen(cmd, start_new_session=True)
             
             # Update service state with new PID
@@ -157,14 +176,44 @@ class ServiceManager:
             self.logger.warning(f"Error terminating process {pid}: {str(e)}")
 
     def _get_service_path(self, service_name: str, version: str = "original") -> Optional[str]:
-        """Get the correct import path for a service version"""
-        if version == "original":
-            if os.path.exists(f"app/microservices/{service_name}/service.py"):
-                return f"app.microservices.{service_name}.service"
-        elif version == "generated":
-            if os.path.exists(f"app/generated_services/{service_name}/service.py"):
-                return f"app.generated_services.{service_name}.service"
-        return None
+        return service_module_path(service_name, version)
+
+    def _host_url(self, service_name: str) -> Optional[str]:
+        service_info = self.port_manager.get_service_info(service_name)
+        return f"http://localhost:{service_info['port']}/_host" if service_info else None
+
+    def get_running_version(self, service_name: str) -> Optional[str]:
+        """Version served by a hot-reload host, None if the service runs as a plain process"""
+        url = self._host_url(service_name)
+        if not url:
+            return None
+        try:
+            response = requests.get(f"{url}/status", timeout=0.5)
+            return response.json().get("version") if response.ok else None
+        except (requests.RequestException, ValueError):
+            return None
+
+    def switch_version(self, service_name: str, version: str) -> Dict:
+        """Serve another version of a running service, in place when it runs in a hot-reload host"""
+        if self.get_service_status(service_name)["status"] != "running":
+            return self.start_service(service_name, version)
+
+        if self.get_running_version(service_name) is not None:
+            try:
+                response = requests.post(f"{self._host_url(service_name)}/reload", json={"version": version}, timeout=60)
+                if response.ok:
+                    result = response.json()
+                    return {
+                        "success": True,
+                        "message": f"Switched {service_name} to {version} version in {result['reload_ms']}ms"
+                    }
+                # The host keeps serving the previous version when a reload fails
+                return {"success": False, "message": response.json().get("detail", response.text)}
+            except requests.RequestException as e:
+                self.logger.warning(f"Hot reload of {service_name} failed, restarting it: {str(e)}")
+
+        self.stop_service(service_name)
+        return self.start_service(service_name, version)
 
     def get_service_logs(self, service_name: str, lines: int = 100) -> List[str]:
         """Get recent logs for a service"""
@@ -0,0 +1,247 @@
+import csv
+import json
+import os
+import re
+import socket
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from app.utils.feedback_rollups import split_services
+from app.utils.logger import setup_logger
+from app.utils.param_adapters import get_param_adapters
+from app.utils.port_manager import get_port_manager
+
+logger = setup_logger("ServicePrewarm")
+
+SERVICE_HISTORY_FILE = "experiments/4o-mini/service_analysis_4om.csv"
+
+STOPWORDS = {
+    "about", "also", "want", "would", "like", "love", "some", "that", "this", "there", "with", "from",
+    "have", "what", "where", "when", "just", "into", "while", "them", "they", "their", "your", "more",
+    "really", "maybe", "could", "should", "place", "places", "good", "great", "time", "today", "around"
+}
+
+
+def query_tokens(text: str) -> Set[str]:
+    return {token for token in re.findall(r"[a-z]+", (text or "").lower()) if len(token) > 3 and token not in STOPWORDS}
+
+
+class ServiceCoOccurrenceModel:
+    """
+    Predicts the services a builder session will need from historical selections.
+
+    Sessions are sets of needed services, from the evaluation runs and from user feedback (selected
+    services minus the unnecessary ones, plus the missing ones). Words of past queries point to the
+    services those sessions needed, and services that were needed together pull each other in.
+    """
+
+    def __init__(self, min_token_count: int = 2):
+        self.min_token_count = min_token_count
+        self.sessions = 0
+        self.service_counts: Counter = Counter()
+        self.pair_counts: Dict[str, Counter] = defaultdict(Counter)
+        self.token_counts: Counter = Counter()
+        self.token_service_counts: Dict[str, Counter] = defaultdict(Counter)
+
+    def add_session(self, services: Iterable[str], query: Optional[str] = None):
+        services = set(services)
+        if not services:
+            return
+        self.sessions += 1
+        self.service_counts.update(services)
+        for service in services:
+            self.pair_counts[service].update(services - {service})
+        for token in query_tokens(query):
+            self.token_counts[token] += 1
+            self.token_service_counts[token].update(services)
+
+    def load_history(self, history_file: str = SERVICE_HISTORY_FILE):
+        if not os.path.exists(history_file):
+            return
+        with open(history_file, "r", newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                self.add_session(split_services(row.get("expected_services")), row.get("original_query"))
+
+    def load_feedback(self, feedback_file: str):
+        if not os.path.exists(feedback_file):
+            return
+        with open(feedback_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                needed = set(split_services(record.get("selected_services")))
+                needed -= set(split_services(record.get("unnecessary_services")))
+                needed |= set(split_services(record.get("missing_services")))
+                query = record.get("user_query")
+                self.add_session(needed, None if query == "No query provided" else query)
+
+    def predict(self, text: str = "", known_services: Iterable[str] = (), k: int = 3) -> Dict[str, float]:
+        """Up to k services with the estimated probability that the session needs them"""
+        scores = {service: 1.0 for service in known_services if service}
+
+        # Services the words so far point to
+        for token in query_tokens(text):
+            count = self.token_counts.get(token, 0)
+            if count < self.min_token_count:
+                continue
+            for service, together in self.token_service_counts[token].items():
+                scores[service] = max(scores.get(service, 0.0), together / count)
+
+        if scores:
+            # Services usually needed together with the likely ones
+            for service, probability in list(scores.items()):
+                base = self.service_counts.get(service)
+                if not base:
+                    continue
+                for other, together in self.pair_counts[service].items():
+                    scores[other] = max(scores.get(other, 0.0), probability * together / base)
+        elif self.sessions:
+            # Nothing said yet, fall back to how often each service is needed at all
+            scores = {service: count / self.sessions for service, count in self.service_counts.items()}
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return dict(ranked)
+
+
+class ServicePrewarmer:
+    """
+    Gets the services a builder session is likely to need ready while the chat is still going on:
+    starts them if they are stopped, compiles their parameter adapters for app generation, and sends
+    the request the app will make for the parameters collected so far, through the aggregator when it
+    is registered, so service data, the aggregator's connection pool and its response cache are warm.
+    """
+
+    def __init__(self, model: Optional[ServiceCoOccurrenceModel] = None):
+        self.enabled = os.getenv("SERVICE_PREWARM", "true").lower() == "true"
+        self.min_probability = float(os.getenv("SERVICE_PREWARM_MIN_PROBABILITY", "0.5"))
+        self.max_services = int(os.getenv("SERVICE_PREWARM_MAX_SERVICES", "3"))
+        # A service is warmed at most once per cooldown, however many turns predict it
+        self.cooldown = float(os.getenv("SERVICE_PREWARM_COOLDOWN", "300"))
+        self.model = model
+        self.port_manager = get_port_manager()
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="service-prewarm")
+        # (service, parameters) -> time warmed, new parameters are a new request to warm
+        self.warmed_at: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def _get_model(self) -> ServiceCoOccurrenceModel:
+        if self.model is None:
+            model = ServiceCoOccurrenceModel()
+            model.load_history()
+            model.load_feedback(os.getenv("FEEDBACK_FILE", "data/user_feedback.jsonl"))
+            logger.info(f"Built service co-occurrence model from {model.sessions} sessions")
+            self.model = model
+        return self.model
+
+    def observe(
+        self,
+        conversation_history: List[Dict],
+        known_services: Iterable[str] = (),
+        parameters: Optional[Dict[str, Dict]] = None
+    ) -> Dict[str, float]:
+        """Predict the services of a session from its messages so far and warm the likely ones"""
+        if not self.enabled:
+            return {}
+        text = " ".join(m["content"] for m in conversation_history if m.get("role") == "user")
+        predictions = self._get_model().predict(text, known_services, self.max_services)
+        likely = [service for service, probability in predictions.items() if probability >= self.min_probability]
+        self.prewarm(likely, parameters)
+        return predictions
+
+    def prewarm(self, services: Iterable[str], parameters: Optional[Dict[str, Dict]] = None):
+        # The chatbot may key parameters by "<name>_service"
+        parameters = {service.replace("_service", ""): params for service, params in (parameters or {}).items()}
+        now = time.time()
+        with self._lock:
+            due = []
+            for service in services:
+                params = parameters.get(service, {})
+                key = (service, json.dumps(params, sort_keys=True))
+                if now - self.warmed_at.get(key, 0) >= self.cooldown:
+                    self.warmed_at[key] = now
+                    due.append((key, params))
+        for key, params in due:
+            self.executor.submit(self._warm, key, params)
+
+    def _wait_for_port(self, port: int, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                sock.settimeout(0.2)
+                if sock.connect_ex(("localhost", port)) == 0:
+                    return True
+            time.sleep(0.2)
+        return False
+
+    def _ensure_running(self, service_name: str) -> Optional[int]:
+        """Port of a registered service once it accepts connections, starting it if it is stopped"""
+        from app.utils.service_manager import ServiceManager
+
+        port = self.port_manager.get_service_info(service_name).get("port")
+        if port is None:
+            return None
+        manager = ServiceManager()
+        if manager.get_service_status(service_name)["status"] != "running":
+            result = manager.start_service(service_name)
+            if not result["success"]:
+                logger.warning(f"Could not start {service_name} for pre-warming: {result['message']}")
+                return None
+        if not self._wait_for_port(port, timeout=15):
+            logger.warning(f"{service_name} did not open port {port} in time")
+            return None
+        return port
+
+    def _warm(self, key: Tuple[str, str], params: Dict):
+        import requests
+
+        service_name = key[0]
+        try:
+            start = time.perf_counter()
+            port = self._ensure_running(service_name)
+            if port is None:
+                return
+
+            # Compiles the adapter app generation will use and maps the parameters the same way it will
+            request, errors = get_param_adapters().adapt(service_name, port, params)
+            if errors:
+                # The service would reject the request before its handler runs, nothing would be warmed
+                logger.info(f"Started {service_name}, not sending a warm-up request yet: {'; '.join(errors)}")
+                return
+
+            # The same call the generated app sends on a cache miss, so it primes the same aggregator cache entry
+            aggregator_port = self._ensure_running("aggregator")
+            if aggregator_port is not None:
+                call = {"name": service_name, "path": request["path"], "query": request["query"], "params": request["body"]}
+                response = requests.post(
+                    f"http://localhost:{aggregator_port}/aggregator", json={"services": [call]}, timeout=10
+                )
+            else:
+                response = requests.post(
+                    f"http://localhost:{port}{request['path']}", json=request["body"], params=request["query"], timeout=10
+                )
+            logger.info(
+                f"Pre-warmed {service_name} in {(time.perf_counter() - start) * 1000:.0f}ms "
+                f"(warm-up request returned {response.status_code})"
+            )
+        except Exception as e:
+            logger.warning(f"Pre-warming {service_name} failed: {str(e)}")
+            with self._lock:
+                self.warmed_at.pop(key, None)
+
+
+# Global instance of ServicePrewarmer
+_service_prewarmer = None
+_service_prewarmer_lock = threading.Lock()
+
+
+def get_service_prewarmer():
+    global _service_prewarmer
+    if _service_prewarmer is None:
+        with _service_prewarmer_lock:
+            if _service_prewarmer is None:
+                _service_prewarmer = ServicePrewarmer()
+    return _service_prewarmer
@@ -0,0 +1,114 @@
+import json
+from typing import Any, Dict, List, Tuple
+
+
+def build_extraction_schema(microservices: List[Dict[str, str]], params_list: Dict) -> Dict:
+    """Build the JSON schema the LLM must follow when reporting services and parameters"""
+    service_properties = {}
+    for ms in microservices:
+        service = ms["name"]
+        if service in params_list:
+            service_properties[service] = {
+                "type": "object",
+                "properties": {
+                    param: {"type": "array", "items": {"type": "string", "enum": values}}
+                    for param, values in params_list[service].items()
+                },
+                "additionalProperties": False
+            }
+        else:
+            service_properties[service] = {
+                "type": "object",
+                "additionalProperties": {"type": "array", "items": {"type": "string"}}
+            }
+
+    return {
+        "type": "object",
+        "properties": {
+            "services": {
+                "type": "object",
+                "properties": service_properties,
+                "additionalProperties": False
+            }
+        },
+        "required": ["services"],
+        "additionalProperties": False
+    }
+
+
+def parse_json_response(response_text: str) -> Any:
+    """Parse a JSON reply, tolerating markdown code fences around it"""
+    text = response_text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    return json.loads(text)
+
+
+def validate_extraction(data: Any, microservices: List[Dict[str, str]], params_list: Dict) -> Tuple[Dict, List[str]]:
+    """
+    Validate an extraction against the known services and parameter options.
+    Returns the valid subset (values mapped to their canonical spelling) and a list of problems found.
+    """
+    errors = []
+    if not isinstance(data, dict) or not isinstance(data.get("services"), dict):
+        return {}, ['The response must be a JSON object with a "services" object at the top level.']
+
+    known_services = {ms["name"] for ms in microservices}
+    services_and_params = {}
+
+    for service, params in data["services"].items():
+        if service not in known_services:
+            errors.append(f'Unknown service "{service}". Use only: {", ".join(sorted(known_services))}.')
+            continue
+        if not isinstance(params, dict):
+            errors.append(f'Parameters of "{service}" must be an object mapping parameter names to lists of values.')
+            continue
+
+        allowed_params = params_list.get(service)
+        valid_params = {}
+        for param, values in params.items():
+            if allowed_params is not None and param not in allowed_params:
+                errors.append(f'"{param}" is not a parameter of "{service}". Use only: {", ".join(allowed_params)}.')
+                continue
+            if isinstance(values, (str, int, float)):
+                values = [values]
+            if not isinstance(values, list):
+                errors.append(f'Values of "{service}.{param}" must be a list of strings.')
+                continue
+
+            valid_values = []
+            for value in values:
+                value = str(value).strip()
+                if allowed_params is None:
+                    valid_values.append(value)
+                    continue
+                canonical = {v.lower(): v for v in allowed_params[param]}.get(value.lower())
+                if canonical is None:
+                    errors.append(
+                        f'"{value}" is not an allowed value for "{service}.{param}". '
+                        f'Use only: {", ".join(allowed_params[param])}.'
+                    )
+                else:
+                    valid_values.append(canonical)
+            if valid_values:
+                valid_params[param] = valid_values
+
+        # Services without any confirmed parameter are left out, as the prompt asks
+        if valid_params:
+            services_and_params[service] = valid_params
+
+    return services_and_params, errors
+
+
+def build_repair_prompt(original_prompt: str, response_text: str, errors: List[str]) -> str:
+    problems = "\n".join(f"- {error}" for error in errors)
+    return f"""{original_prompt}
+
+Your previous answer was:
+{response_text}
+
+It had these problems:
+{problems}
+
+Return the corrected JSON object only, keeping every valid service and parameter from your previous answer."""
@@ -0,0 +1,114 @@
+"""
+Import-time benchmark for service modules.
+
+Runs `python -X importtime -c "import <module>"` in fresh interpreters, reports the
+cumulative import time of the module and its slowest dependencies, and can append
+the result to a JSONL history so cold-start cost can be tracked across releases:
+
+    python -m benchmarks.import_time --repeat 5 --history benchmarks/import_time_history.jsonl
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List
+
+DEFAULT_MODULE = "app.microservices.chatbot_llm.service"
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """Parse `-X importtime` output into {module, self_us, cumulative_us} records"""
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            records.append({
+                "module": name.strip(),
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us)
+            })
+        except ValueError:
+            continue
+    return records
+
+
+def measure(module: str) -> Dict:
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    records = parse_importtime(result.stderr)
+    target = next((r for r in records if r["module"] == module), None)
+    return {
+        "wall_ms": wall_ms,
+        "import_ms": target["cumulative_us"] / 1000 if target else None,
+        "records": records
+    }
+
+
+def slowest_packages(records: List[Dict], limit: int) -> List[Dict]:
+    """Top-level packages ranked by the import time spent in their own modules"""
+    totals = {}
+    for record in records:
+        package = record["module"].split(".")[0]
+        totals[package] = totals.get(package, 0) + record["self_us"]
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+    return [{"package": name, "self_ms": us / 1000} for name, us in ranked[:limit]]
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--tags", "--always", "--dirty"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import time of a service module")
+    parser.add_argument("--module", default=DEFAULT_MODULE)
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters to run, the best run is reported")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest packages to list")
+    parser.add_argument("--history", help="Append the result to this JSONL file")
+    parser.add_argument("--max-ms", type=float, help="Exit non-zero if the import takes longer than this")
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(args.repeat)]
+    best = min(runs, key=lambda run: run["import_ms"] or float("inf"))
+
+    report = {
+        "timestamp": datetime.now().isoformat(),
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "module": args.module,
+        "import_ms": best["import_ms"],
+        "wall_ms": min(run["wall_ms"] for run in runs),
+        "slowest_packages": slowest_packages(best["records"], args.top)
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.history:
+        os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+        with open(args.history, "a") as f:
+            f.write(json.dumps(report) + "\n")
+
+    if args.max_ms is not None and (report["import_ms"] is None or report["import_ms"] > args.max_ms):
+        print(f"Import of {args.module} took {report['import_ms']} ms, limit is {args.max_ms} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Load generator for the chatbot_llm service.
+
+Drives /chat with N concurrent scripted sessions built from the conversations in
+experiments/4o-mini/service_analysis_4om.csv and reports throughput, latency
+percentiles and failure rates. With --start-service the chatbot is launched with
+LLM_PROVIDER=fake, so the whole run needs no network access:
+
+    python -m benchmarks.load_test --start-service --sessions 50 --concurrency 25
+"""
+import argparse
+import asyncio
+import csv
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+import httpx
+from app.utils.chatbot import initialize_conversation
+from app.utils.logger import setup_logger
+
+logger = setup_logger("LoadTest")
+
+DEFAULT_CSV = os.path.join("experiments", "4o-mini", "service_analysis_4om.csv")
+
+FOLLOW_UPS = [
+    "I have about 4 hours and would prefer to walk or take public transport.",
+    "That sounds great. I'm vegetarian and travelling with one friend.",
+    "Yes",
+]
+
+
+def load_scripts(csv_path: str) -> List[List[str]]:
+    """One scripted session per conversation: the original query followed by fixed follow-ups"""
+    scripts = []
+    with open(csv_path, "r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            query = row.get("original_query", "").strip()
+            if query:
+                scripts.append([query] + FOLLOW_UPS)
+    if not scripts:
+        raise ValueError(f"No conversations found in {csv_path}")
+    return scripts
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+async def run_session(client: httpx.AsyncClient, url: str, script: List[str], results: Dict):
+    state = initialize_conversation()
+    for user_input in script:
+        start = time.perf_counter()
+        try:
+            response = await client.post(url, json={"user_input": user_input, "conversation_state": state})
+            response.raise_for_status()
+            state = response.json()["conversation_state"]
+            results["latencies"].append(time.perf_counter() - start)
+        except Exception as e:
+            results["failures"] += 1
+            results["errors"][type(e).__name__] = results["errors"].get(type(e).__name__, 0) + 1
+            # The rest of the script depends on this turn's state
+            return
+    results["completed_sessions"] += 1
+
+
+async def run_load_test(url: str, scripts: List[List[str]], sessions: int, concurrency: int, timeout: float) -> Dict:
+    results = {"latencies": [], "failures": 0, "errors": {}, "completed_sessions": 0}
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        async def bounded(script):
+            async with semaphore:
+                await run_session(client, url, script, results)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(bounded(scripts[i % len(scripts)]) for i in range(sessions)))
+        elapsed = time.perf_counter() - start
+
+    latencies = results["latencies"]
+    requests_sent = len(latencies) + results["failures"]
+    return {
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "completed_sessions": results["completed_sessions"],
+        "requests": requests_sent,
+        "failures": results["failures"],
+        "failure_rate": results["failures"] / requests_sent if requests_sent else 0.0,
+        "errors": results["errors"],
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "latency_seconds": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": max(latencies) if latencies else None,
+        },
+    }
+
+
+def start_fake_chatbot(port: int) -> subprocess.Popen:
+    """Launch chatbot_llm with the fake LLM provider and wait until it accepts requests on that provider"""
+    env = dict(os.environ, LLM_PROVIDER="fake")
+    process = subprocess.Popen([sys.executable, "-m", "app.microservices.chatbot_llm.service"], env=env)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("chatbot_llm exited during startup")
+        try:
+            provider = httpx.get(f"http://localhost:{port}/status", timeout=1).json().get("provider")
+        except (httpx.HTTPError, ValueError):
+            time.sleep(0.5)
+            continue
+        if provider != "fake":
+            # Another chatbot_llm already holds the port, or the environment switched providers
+            process.terminate()
+            raise RuntimeError(f"chatbot_llm on port {port} uses the {provider} provider, refusing to load test it")
+        return process
+    process.terminate()
+    raise RuntimeError("chatbot_llm did not start within 60s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the chatbot_llm /chat endpoint")
+    parser.add_argument("--url", help="Chat endpoint, defaults to the chatbot_llm port in services.toml")
+    parser.add_argument("--csv", default=DEFAULT_CSV, help="Conversations to script sessions from")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=90)
+    parser.add_argument("--start-service", action="store_true", help="Start chatbot_llm with LLM_PROVIDER=fake")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--max-p95", type=float, help="Exit non-zero if p95 latency (s) exceeds this")
+    parser.add_argument("--max-failure-rate", type=float, help="Exit non-zero if the failure rate exceeds this")
+    args = parser.parse_args()
+
+    port = None
+    if args.start_service or not args.url:
+        from app.utils.port_manager import get_port_manager
+        port = get_port_manager().get_service_info("chatbot_llm").get("port")
+    url = args.url or f"http://localhost:{port}/chat"
+
+    process = start_fake_chatbot(port) if args.start_service else None
+    try:
+        report = asyncio.run(
+            run_load_test(url, load_scripts(args.csv), args.sessions, args.concurrency, args.timeout)
+        )
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=10)
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    p95 = report["latency_seconds"]["p95"]
+    if args.max_p95 is not None and (p95 is None or p95 > args.max_p95):
+        logger.error(f"p95 latency {p95} exceeds {args.max_p95}s")
+        sys.exit(1)
+    if args.max_failure_rate is not None and report["failure_rate"] > args.max_failure_rate:
+        logger.error(f"Failure rate {report['failure_rate']:.2%} exceeds {args.max_failure_rate:.2%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Batch service generation.
+
+Runs refine -> match -> generate for every query in a JSONL file with bounded concurrency,
+using async LLM calls so the slow LLM round trips of different queries overlap:
+
+    python dynamic/batch_pipeline.py --input queries.jsonl --output results.jsonl --concurrency 4
+
+Each input line is a JSON object with the query in "query" (or "body"/"original_query") and an
+optional "id" (or "request_id"). One result line is appended to the output as soon as its query
+finishes, and the output doubles as the checkpoint: rerunning the same command skips queries
+that already completed and retries the ones that failed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from llm_metrics import get_metrics_handler
+from query_refiner import QueryRefiner
+from service_generator import ServiceGenerator
+from service_manager import ServiceManager
+
+
+def load_queries(path):
+    queries = []
+    with open(path, "r") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            query = record.get("query") or record.get("body") or record.get("original_query")
+            if not query:
+                print(f"Skipping line {line_number}: no query found")
+                continue
+            query_id = str(record.get("id") or record.get("request_id") or line_number)
+            queries.append({"id": query_id, "query": query})
+    return queries
+
+
+def load_checkpoint(output_path):
+    """Ids of queries that already completed in a previous run"""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-write leaves a partial last line
+                continue
+            if record.get("status") == "ok":
+                completed.add(record["id"])
+    return completed
+
+
+async def process_query(item, query_refiner, service_generator):
+    record = {"id": item["id"], "query": item["query"], "timings": {}}
+    try:
+        start = time.perf_counter()
+        refiner_result = await query_refiner.arefine(item["query"])
+        record["timings"]["refine_and_match"] = round(time.perf_counter() - start, 3)
+
+        if refiner_result["service_exists"]:
+            record.update(status="ok", service_exists=True, service_name=refiner_result["service_name"])
+            return record
+
+        start = time.perf_counter()
+        generator_result = await service_generator.agenerate(
+            refiner_result["refined_query"],
+            refiner_result["needs_json_data"],
+            refiner_result.get("json_data_info"),
+            refiner_result["http_method"],
+        )
+        record["timings"]["generate"] = round(time.perf_counter() - start, 3)
+        if not generator_result:
+            record.update(status="failed", error="Service generation returned no service")
+        else:
+            record.update(status="ok", service_exists=False, service_name=generator_result["service_name"])
+    except Exception as e:
+        record.update(status="failed", error=f"{type(e).__name__}: {e}")
+    return record
+
+
+async def run_pipeline(queries, output_path, concurrency, query_refiner, service_generator):
+    completed = load_checkpoint(output_path)
+    pending = [item for item in queries if item["id"] not in completed]
+    print(f"{len(queries)} queries, {len(queries) - len(pending)} already completed, {len(pending)} to run")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    summary = {"ok": 0, "failed": 0}
+    start = time.perf_counter()
+
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    with open(output_path, "a") as out:
+        async def worker(item):
+            async with semaphore:
+                record = await process_query(item, query_refiner, service_generator)
+            # Written as soon as the query finishes, so a crash loses at most the in-flight queries
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            summary[record["status"]] += 1
+            print(f"[{record['status']}] {item['id']}: {record.get('service_name') or record.get('error')}")
+
+        await asyncio.gather(*(worker(item) for item in pending))
+
+    summary["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refine, match and generate services for a batch of queries")
+    parser.add_argument("--input", required=True, help="JSONL file of queries")
+    parser.add_argument("--output", required=True, help="JSONL file results are appended to, also used to resume")
+    parser.add_argument("--concurrency", type=int, default=4, help="Queries processed at the same time")
+    args = parser.parse_args()
+
+    service_manager = ServiceManager()
+    query_refiner = QueryRefiner(service_manager)
+    service_generator = ServiceGenerator(service_manager)
+
+    summary = asyncio.run(
+        run_pipeline(load_queries(args.input), args.output, args.concurrency, query_refiner, service_generator)
+    )
+    summary["llm_metrics"] = get_metrics_handler().summary()
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Token and latency accounting for the LLM calls of the generation pipeline.
+
+Every chain runs on the LLM bound to its pipeline stage, LLMChain(llm=with_stage(llm, "refine"), ...),
+and the callback handler attached to the LLM keeps one record per call in memory, which batch_pipeline
+summarizes per stage when it finishes. With LLM_METRICS_PATH set the records are also appended to that
+file as JSON lines. They share their format with the chatbot_llm gateway, so one file can hold both.
+To aggregate a file:
+
+    python dynamic/llm_metrics.py data/llm_metrics.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from langchain_core.callbacks import BaseCallbackHandler
+
+# The summary is shared with the chatbot_llm gateway, which lives in the app package at the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.utils.llm_metrics import summarize_records  # noqa: E402
+
+METRICS_PATH = os.getenv("LLM_METRICS_PATH", "")
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """Records prompt/completion tokens, wall time, time to first token and errors of every LLM call"""
+
+    def __init__(self, path=METRICS_PATH, component="dynamic", max_records=10000):
+        self.path = path
+        self.component = component
+        self.max_records = max_records
+        self.records = []
+        # run_id -> start time, stage, model and first token time of the calls in flight
+        self.runs = {}
+        self.lock = threading.Lock()
+
+    def record(self, stage, model=None, prompt_tokens=None, completion_tokens=None,
+               latency_ms=None, ttft_ms=None, cached=False, error=None):
+        """
+        Keep one metrics record, and append it to the metrics file when one is set.
+        Also used directly for cache hits that skip the LLM.
+
+        :param stage: Pipeline stage the call belongs to (refine, match, generate)
+        :param cached: True when the answer came from a cache instead of the model
+        """
+        entry = {
+            "timestamp": datetime.now().isoformat(),
+            "component": self.component,
+            "stage": stage,
+            "provider": "openai",
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "latency_ms": round(latency_ms, 1) if latency_ms is not None else None,
+            "ttft_ms": round(ttft_ms, 1) if ttft_ms is not None else None,
+            "cached": cached,
+            "error": error,
+        }
+        with self.lock:
+            self.records.append(entry)
+            if len(self.records) > self.max_records:
+                # The summary covers the most recent calls, the file keeps the full history
+                del self.records[:len(self.records) - self.max_records]
+            if not self.path:
+                return
+            try:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                print(f"Could not write LLM metrics to {self.path}: {e}")
+
+    def summary(self):
+        """Per-stage aggregates of the calls recorded by this process"""
+        with self.lock:
+            records = list(self.records)
+        return summarize_records(records)
+
+    def _start(self, run_id, metadata):
+        metadata = metadata or {}
+        self.runs[run_id] = {
+            "start": time.perf_counter(),
+            "stage": metadata.get("stage", "unknown"),
+            "model": metadata.get("ls_model_name"),
+            "ttft_ms": None,
+        }
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, metadata)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        # Only streamed calls report tokens as they arrive
+        run = self.runs.get(run_id)
+        if run and run["ttft_ms"] is None:
+            run["ttft_ms"] = (time.perf_counter() - run["start"]) * 1000
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self.runs.pop(run_id, None)
+        if run is None:
+            return
+        llm_output = response.llm_output or {}
+        usage = llm_output.get("token_usage") or {}
+        if not usage and response.generations and response.generations[0]:
+            # Chat models also report usage on the message itself
+            message = getattr(response.generations[0][0], "message", None)
+            usage_metadata = getattr(message, "usage_metadata", None) or {}
+            usage = {
+                "prompt_tokens": usage_metadata.get("input_tokens"),
+                "completion_tokens": usage_metadata.get("output_tokens"),
+            }
+        self.record(
+            run["stage"],
+            model=llm_output.get("model_name") or run["model"],
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens"),
+            latency_ms=(time.perf_counter() - run["start"]) * 1000,
+            ttft_ms=run["ttft_ms"],
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        run = self.runs.pop(run_id, None)
+        if run is None:
+            return
+        self.record(
+            run["stage"],
+            model=run["model"],
+            latency_ms=(time.perf_counter() - run["start"]) * 1000,
+            error=f"{type(error).__name__}: {error}",
+        )
+
+
+def with_stage(llm, stage):
+    """The LLM bound to a run config whose calls are recorded under the given stage"""
+    return llm.with_config(metadata={"stage": stage})
+
+
+_metrics_handler = None
+_metrics_handler_lock = threading.Lock()
+
+
+def get_metrics_handler():
+    global _metrics_handler
+    if _metrics_handler is None:
+        with _metrics_handler_lock:
+            if _metrics_handler is None:
+                _metrics_handler = LLMMetricsHandler()
+    return _metrics_handler
+
+
+def summarize(path):
+    """Per component, the per-stage aggregates the chatbot_llm gateway reports on GET /metrics"""
+    groups = {}
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                groups.setdefault(record.get("component") or "unknown", []).append(record)
+    return {component: summarize_records(records) for component, records in sorted(groups.items())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate LLM metrics per pipeline stage")
+    parser.add_argument("path", nargs="?", default=METRICS_PATH or "data/llm_metrics.jsonl", help="JSONL metrics file")
+    args = parser.parse_args()
+    print(json.dumps(summarize(args.path), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import logging
 import os
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
@@ -9,29 +10,57 @@ from langchain.prompts import (
 from langchain.chains import LLMChain
 from langchain.output_parsers import StructuredOutputParser, ResponseSchema
 import json
+from llm_metrics import get_metrics_handler, with_stage
 # from codeqwen import CodeQwenLLM
 
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 API_KEY = os.getenv("OPENAI_API_KEY")
 MODEL = os.getenv("OPENAI_MODEL")
+# Only the top-k most similar services are sent to the LLM for matching
+MATCH_TOP_K = int(os.getenv("SERVICE_MATCH_TOP_K", "5"))
+# Candidates below this similarity are never a match, above the auto threshold the LLM is skipped
+MATCH_MIN_SIMILARITY = float(os.getenv("SERVICE_MATCH_MIN_SIMILARITY", "0.2"))
+MATCH_AUTO_THRESHOLD = float(os.getenv("SERVICE_MATCH_AUTO_THRESHOLD", "0.92"))
+# Hashing embeddings score shared content words, not meaning: a query sharing none with a service scores 0
+# (hash collisions aside), while a genuine match may share a single word, so any overlap goes to the LLM
+MATCH_MIN_SIMILARITY_HASHING = float(os.getenv("SERVICE_MATCH_MIN_SIMILARITY_HASHING", "0.01"))
+
+
+def min_similarity(model_name):
+    """Similarity below which a candidate is never a match, for the embedding model that scored it"""
+    return MATCH_MIN_SIMILARITY_HASHING if model_name.startswith("hashing-") else MATCH_MIN_SIMILARITY
+
 
 class QueryRefiner:
     def __init__(self, service_manager):
         self.service_manager = service_manager
-        self.llm = ChatOpenAI(model_name=MODEL, temperature=0.7)
+        self.metrics = get_metrics_handler()
+        self.llm = ChatOpenAI(model_name=MODEL, temperature=0.7, callbacks=[self.metrics])
         # self.llm = CodeQwenLLM()
 
     def refine(self, query: str):
+        refinement = self._refine_query(query)
+        existing_service = self._check_existing_service(refinement[0])
+        return self._build_result(refinement, existing_service)
+
+    async def arefine(self, query: str):
+        """Async variant of refine, used by the batch pipeline to overlap LLM calls"""
+        refinement = await self._arefine_query(query)
+        existing_service = await self._acheck_existing_service(refinement[0])
+        return self._build_result(refinement, existing_service)
+
+    def _build_result(self, refinement, existing_service):
         (
             refined_query,
             needs_json_data,
             data_sources_needed,
             http_method,
-        ) = self._refine_query(query)
-        existing_service = self._check_existing_service(refined_query)
+        ) = refinement
 
         if existing_service:
-            print("matched existing service")
+            logger.info(f"Matched existing service {existing_service['service_name']}")
             return {
                 "service_exists": True,
                 "service_name": existing_service["service_name"],
@@ -39,7 +68,7 @@ class QueryRefiner:
                 "service_description": existing_service["service_description"],
             }
         else:
-            print(f"Refined query --> {refined_query}")
+            logger.info(f"Refined query: {refined_query}")
             result = {
                 "service_exists": False,
                 "refined_query": refined_query,
@@ -57,11 +86,40 @@ class QueryRefiner:
             return result
 
     def _check_existing_service(self, query: str):
-        services_descriptions = self.service_manager.get_services_descriptions()
-        print(f"Services description ---> {services_descriptions} \n\n\n\n\n")
-        if not services_descriptions:
-            return None
+        candidates, matched = self._shortlist_services(query)
+        if matched is not None or not candidates:
+            return matched
+        chain, output_parser = self._matching_chain()
+        response = chain.run(**self._matching_inputs(query, candidates, output_parser))
+        return self._parse_match(response, output_parser, candidates)
 
+    async def _acheck_existing_service(self, query: str):
+        candidates, matched = self._shortlist_services(query)
+        if matched is not None or not candidates:
+            return matched
+        chain, output_parser = self._matching_chain()
+        response = await chain.arun(**self._matching_inputs(query, candidates, output_parser))
+        return self._parse_match(response, output_parser, candidates)
+
+    def _shortlist_services(self, query: str):
+        """Return (candidates, service matched by similarity alone or None)"""
+        threshold = min_similarity(self.service_manager.index.model_name)
+        candidates = [
+            (service, score)
+            for service, score in self.service_manager.find_similar_services(query, MATCH_TOP_K)
+            if score >= threshold
+        ]
+        if not candidates:
+            return [], None
+
+        best_service, best_score = candidates[0]
+        if best_score >= MATCH_AUTO_THRESHOLD:
+            logger.info(f"Matched {best_service['service_name']} by similarity {best_score:.3f}, skipping LLM")
+            self.metrics.record("match", cached=True)
+            return candidates, best_service
+        return candidates, None
+
+    def _matching_chain(self):
         output_parser = StructuredOutputParser.from_response_schemas(
             [
                 ResponseSchema(
@@ -75,8 +133,6 @@ class QueryRefiner:
             ]
         )
 
-        format_instructions = output_parser.get_format_instructions()
-
         system_template = """You are an AI assistant specializing in matching user queries to existing services.
         Your task is to analyze the user's query and determine if any existing service can fulfill it."""
 
@@ -99,27 +155,38 @@ class QueryRefiner:
             [system_message_prompt, human_message_prompt]
         )
 
-        chain = LLMChain(llm=self.llm, prompt=chat_prompt)
-        response = chain.run(
-            query=query,
-            services=json.dumps(services_descriptions, indent=2),
-            format_instructions=format_instructions,
-        )
+        return LLMChain(llm=with_stage(self.llm, "match"), prompt=chat_prompt), output_parser
 
+    def _matching_inputs(self, query, candidates, output_parser):
+        services_descriptions = [service["service_description"] for service, _ in candidates]
+        logger.debug(f"Matching against {len(services_descriptions)} candidate services: {services_descriptions}")
+        return {
+            "query": query,
+            "services": json.dumps(services_descriptions, indent=2),
+            "format_instructions": output_parser.get_format_instructions(),
+        }
+
+    def _parse_match(self, response, output_parser, candidates):
         try:
             parsed_output = output_parser.parse(response)
             matching_index = int(parsed_output["matching_index"])
-            print(f"parsed_output ---> {parsed_output} \n\n\n\n\n")
-            if matching_index >= 0 and matching_index < len(self.service_manager.services):
-                return self.service_manager.services[matching_index]
+            logger.debug(f"Parsed matching output: {parsed_output}")
+            if matching_index >= 0 and matching_index < len(candidates):
+                return candidates[matching_index][0]
         except ValueError as e:
-            print(f"Error parsing matching_index: {e}")
+            logger.warning(f"Error parsing matching_index: {e}")
         except Exception as e:
-            print(f"Error parsing LLM response for service matching: {e}")
+            logger.warning(f"Error parsing LLM response for service matching: {e}")
 
         return None
 
     def _refine_query(self, query: str):
+        return self._parse_refinement(self._refinement_chain().run(query=query))
+
+    async def _arefine_query(self, query: str):
+        return self._parse_refinement(await self._refinement_chain().arun(query=query))
+
+    def _refinement_chain(self):
         system_template = """You are an AI assistant specializing in refining user queries into clear requests for writing Python FastAPI services.
         Your task is to analyze the user's query and formulate a clear, specific request for a FastAPI service that addresses the general case of the query.
 
@@ -179,10 +246,9 @@ class QueryRefiner:
             [system_message_prompt, human_message_prompt]
         )
 
-        chain = LLMChain(llm=self.llm, prompt=chat_prompt)
-        result = chain.run(query=query)
+        return LLMChain(llm=with_stage(self.llm, "refine"), prompt=chat_prompt)
 
-        # Parse the result
+    def _parse_refinement(self, result):
         refined_query = (
             result.split("Refined query:")[1]
             .split("Needs JSON data:")[0]
@@ -210,8 +276,7 @@ class QueryRefiner:
         ]
         http_method = "POST"  # Always POST to match existing services
 
-        print("data sources needed--->", data_sources_needed)
-        print("HTTP Method --->", http_method, "\n\n\n\n")
+        logger.debug(f"Data sources needed: {data_sources_needed}, HTTP method: {http_method}")
         return (
             refined_query,
             needs_json_data,
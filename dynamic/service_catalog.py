@@ -0,0 +1,93 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+CATALOG_PATH = os.getenv("SERVICE_CATALOG_PATH", "data/service_catalog.db")
+
+
+class ServiceCatalog:
+    """
+    Persistent catalog of generated services, stored in SQLite with the service name as primary key.
+    Each row keeps the service info, its request schema, a hash of its code and its description embedding.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or CATALOG_PATH
+        self._connection = None
+        self._lock = threading.Lock()
+
+    @property
+    def connection(self):
+        # Opened on first use so importing the manager never touches the disk
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS services (
+                    service_name TEXT PRIMARY KEY,
+                    service_description TEXT NOT NULL,
+                    request_body TEXT,
+                    code_hash TEXT,
+                    info TEXT NOT NULL,
+                    embedding TEXT,
+                    embedding_model TEXT,
+                    updated_at TEXT NOT NULL
+                )"""
+            )
+            self._connection.commit()
+        return self._connection
+
+    def load(self):
+        """
+        Load every catalogued service.
+
+        :return: List of (service_info, embedding, embedding_model) tuples in insertion order
+        """
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT info, embedding, embedding_model FROM services ORDER BY rowid"
+            ).fetchall()
+        return [(json.loads(info), json.loads(embedding) if embedding else None, model) for info, embedding, model in rows]
+
+    def upsert(self, service_info, embedding=None, embedding_model=None):
+        """Insert or replace one service, only that row is written"""
+        request_body = service_info.get("request_body")
+        if request_body is not None and not isinstance(request_body, str):
+            # Generated services carry their request body as a JSON schema dict
+            request_body = json.dumps(request_body)
+        with self._lock:
+            self.connection.execute(
+                """INSERT INTO services (service_name, service_description, request_body, code_hash, info,
+                                         embedding, embedding_model, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(service_name) DO UPDATE SET
+                       service_description = excluded.service_description,
+                       request_body = excluded.request_body,
+                       code_hash = excluded.code_hash,
+                       info = excluded.info,
+                       embedding = excluded.embedding,
+                       embedding_model = excluded.embedding_model,
+                       updated_at = excluded.updated_at""",
+                (
+                    service_info["service_name"],
+                    service_info["service_description"],
+                    request_body,
+                    service_info.get("code_hash"),
+                    json.dumps(service_info),
+                    json.dumps(embedding) if embedding is not None else None,
+                    embedding_model,
+                    datetime.now().isoformat(),
+                ),
+            )
+            self.connection.commit()
+
+    def find_by_code_hash(self, code_hash):
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT info FROM services WHERE code_hash = ?", (code_hash,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
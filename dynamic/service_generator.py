@@ -8,16 +8,38 @@ from langchain.prompts import (
 )
 from langchain.chains import LLMChain
 from langchain.output_parsers import StructuredOutputParser, ResponseSchema
+import asyncio
+import hashlib
 import json
+from llm_metrics import get_metrics_handler, with_stage
+from service_validator import validate_service_code
 
 load_dotenv()
 API_KEY = os.getenv("OPENAI_API_KEY")
 MODEL = os.getenv("OPENAI_MODEL")
+VALIDATE_SERVICES = os.getenv("SERVICE_VALIDATION", "true").lower() == "true"
+
+# Query helpers of app/utils/data_access.py, generated services filter through them instead of scanning lists
+DATA_ACCESS_INSTRUCTIONS = """self.data is a shared, indexed, read-only view of the data source. Query it with these helpers
+        instead of looping over the records, and never modify the records they return:
+        - self.data.where(field=value, other_field=[value1, value2]) -> records whose fields equal the values.
+          Matching is case-insensitive, a list matches any of its values, array fields match when they contain
+          the value, and None or empty values are ignored, so optional request parameters can be passed directly.
+          Fields that are not Python identifiers are passed as self.data.where(**{"Event Name": value}).
+        - self.data.between(field, low, high, **filters) -> records with low <= field <= high for number and
+          date-time fields, either bound may be None
+        - self.data.nearest(field, target, **filters) -> the single record whose number or date-time field is
+          closest to target (an ISO timestamp string, defaults to now)
+        - self.data.nearest_per(field, group_by, target, groups=None) -> for every value of group_by (or only
+          those in groups) the record closest to target, e.g. the reading nearest to a time for each location
+        - self.data.distinct(field) -> the distinct values of a field
+        - self.data.get(key) -> the record stored under a key, for sources that are JSON objects keyed by name
+        - self.data.all() -> every record"""
 
 class ServiceGenerator:
     def __init__(self, service_manager):
         self.service_manager = service_manager
-        self.llm = ChatOpenAI(model_name=MODEL, temperature=0.7)
+        self.llm = ChatOpenAI(model_name=MODEL, temperature=0.7, callbacks=[get_metrics_handler()])
         self.output_dir = "app/generated_services"
         
         # Ensure output directory exists
@@ -34,11 +56,68 @@ class ServiceGenerator:
         service_info = self._generate_service_info(
             refined_query, needs_json_data, json_data_info, http_method
         )
+        errors = self._validate(service_info)
+        if errors:
+            # One targeted regeneration that is told what went wrong
+            service_info = self._generate_service_info(
+                self._repair_query(refined_query, errors), needs_json_data, json_data_info, http_method
+            )
+            errors = self._validate(service_info)
+        if errors:
+            print(f"Generated service failed validation, not saving it: {errors}")
+            return None
+        return self._save_service(service_info)
+
+    async def agenerate(
+        self,
+        refined_query,
+        needs_json_data,
+        json_data_info=None,
+        http_method="POST",
+    ):
+        """Async variant of generate, used by the batch pipeline to overlap LLM calls"""
+        service_info = await self._agenerate_service_info(
+            refined_query, needs_json_data, json_data_info, http_method
+        )
+        errors = await asyncio.to_thread(self._validate, service_info)
+        if errors:
+            service_info = await self._agenerate_service_info(
+                self._repair_query(refined_query, errors), needs_json_data, json_data_info, http_method
+            )
+            errors = await asyncio.to_thread(self._validate, service_info)
+        if errors:
+            print(f"Generated service failed validation, not saving it: {errors}")
+            return None
+        return self._save_service(service_info)
+
+    def _validate(self, service_info):
+        if not service_info or not service_info.get("code"):
+            return ["The response did not contain any service code"]
+        if not VALIDATE_SERVICES:
+            return []
+        errors = validate_service_code(self._clean_generated_code(service_info["code"]))
+        for error in errors:
+            print(f"Validation error in {service_info['service_name']}: {error}")
+        return errors
 
+    def _repair_query(self, refined_query, errors):
+        problems = "\n".join(f"- {error}" for error in errors)
+        return f"""{refined_query}
+
+A previous attempt at this service was rejected by validation with these errors:
+{problems}
+Make sure the new code fixes every one of them."""
+
+    def _save_service(self, service_info):
         if service_info:
             code = service_info.pop("code", None)
             if code:
                 clean_code = self._clean_generated_code(code)
+                service_info["code_hash"] = hashlib.sha256(clean_code.encode("utf-8")).hexdigest()
+                existing = self.service_manager.get_service_by_code_hash(service_info["code_hash"])
+                if existing and existing["service_name"] != service_info["service_name"]:
+                    print(f"Generated code is identical to {existing['service_name']}, reusing it")
+                    return existing
                 service_name = service_info["service_name"]
                 
                 # Create service directory if it doesn't exist
@@ -67,6 +146,30 @@ class ServiceGenerator:
         needs_json_data,
         json_data_info=None,
         http_method="POST",
+    ):
+        chain, output_parser, inputs = self._generation_chain(
+            refined_query, needs_json_data, json_data_info, http_method
+        )
+        return self._parse_service_info(chain.run(**inputs), output_parser, inputs["data_path"])
+
+    async def _agenerate_service_info(
+        self,
+        refined_query,
+        needs_json_data,
+        json_data_info=None,
+        http_method="POST",
+    ):
+        chain, output_parser, inputs = self._generation_chain(
+            refined_query, needs_json_data, json_data_info, http_method
+        )
+        return self._parse_service_info(await chain.arun(**inputs), output_parser, inputs["data_path"])
+
+    def _generation_chain(
+        self,
+        refined_query,
+        needs_json_data,
+        json_data_info=None,
+        http_method="POST",
     ):
         output_parser = StructuredOutputParser.from_response_schemas(
             [
@@ -100,11 +203,12 @@ class ServiceGenerator:
         from pydantic import BaseModel
         from typing import Optional, List
         from app.microservices.base import MicroserviceBase
+        from app.utils.data_access import get_data_source
 
         2. Must follow this exact class pattern:
         - Main service class inherits from MicroserviceBase
         - Has __init__ that calls super().__init__("service_name") and updates service info
-        - Has load_data method that handles JSON loading with try/except
+        - Gets its data with get_data_source in __init__, never opens or json.loads data files itself
         - Has register_routes method with POST endpoint
         - Has process_request method for business logic
         - Must end with start_service function and main block
@@ -112,9 +216,10 @@ class ServiceGenerator:
         3. Must use these exact patterns:
         - Pydantic models use Optional[List[str]] for string lists
         - Pydantic models use Optional[str] for single strings
-        - Load data in __init__ and store as instance variable
+        - Store the data source as an instance variable in __init__
+        - Filter data with the data source query helpers instead of loops over all records
         - Include proper error handling and logging
-        - Use exact data paths from json_data_info
+        - Use exact data source names from json_data_info
         - Service name should be in snake_case without _service suffix
 
         The data source information provided must be used exactly as specified:
@@ -125,7 +230,7 @@ class ServiceGenerator:
         Create a FastAPI microservice based on the following refined query:
         {refined_query}
 
-        Use this EXACT data path: {data_path}
+        Use this EXACT data source: {data_source_name} (loaded from {data_path})
         
         Follow this EXACT schema for the Pydantic model:
         {schema}
@@ -140,20 +245,11 @@ class ServiceGenerator:
                 description="Service specific description",
                 dependencies=[]
             )
-            self.data = self.load_data()
-
-        def load_data(self):
-            try:
-                with open('{data_path}', 'r') as f:
-                    return json.load(f)
-            except FileNotFoundError:
-                self.logger.error("{data_path} not found")
-                return []  # or empty dict based on data structure
-            except json.JSONDecodeError:
-                self.logger.error("Error decoding {data_path}")
-                return []  # or empty dict based on data structure
+            self.data = get_data_source("{data_source_name}")
         ```
 
+        {data_access_instructions}
+
         2. Must end with this exact pattern (note: no _service suffix in names):
         ```python
         def start_service_name():
@@ -171,18 +267,22 @@ class ServiceGenerator:
 
         if needs_json_data and json_data_info:
             data_source = json_data_info[0]  # Use first data source
+            data_source_name = data_source["name"]
             data_path = data_source["path"]
             schema = json.dumps(data_source["schema"], indent=2)
             json_instructions = """The service must:
-            1. Use the exact JSON file path provided
+            1. Use the exact data source name provided
             2. Follow the JSON schema exactly
             3. Handle all fields defined in the schema
             4. Include proper validation
-            5. Handle data loading errors appropriately for the data structure"""
+            5. Handle an empty data source (missing or unreadable file) gracefully"""
+            data_access_instructions = DATA_ACCESS_INSTRUCTIONS
         else:
+            data_source_name = "specific_data"
             data_path = "data/specific_data.json"
             schema = "{}"
             json_instructions = ""
+            data_access_instructions = "This service does not need a data source, leave out the get_data_source line."
 
         system_message_prompt = SystemMessagePromptTemplate.from_template(
             system_template
@@ -194,27 +294,24 @@ class ServiceGenerator:
             [system_message_prompt, human_message_prompt]
         )
 
-        chain = LLMChain(llm=self.llm, prompt=chat_prompt)
+        chain = LLMChain(llm=with_stage(self.llm, "generate"), prompt=chat_prompt)
         # Check expected keys
         print("Expected input keys:", chat_prompt.input_variables)
 
-        # Check provided inputs
-        print("Provided inputs:", {
+        inputs = {
             "refined_query": refined_query,
             "json_instructions": json_instructions,
             "format_instructions": format_instructions,
             "data_path": data_path,
+            "data_source_name": data_source_name,
+            "data_access_instructions": data_access_instructions,
             "schema": schema
-        })
-
-        result = chain.run(
-            refined_query=refined_query,
-            json_instructions=json_instructions,
-            format_instructions=format_instructions,
-            data_path=data_path,
-            schema=schema
-        )
+        }
+        # Check provided inputs
+        print("Provided inputs:", inputs)
+        return chain, output_parser, inputs
 
+    def _parse_service_info(self, result, output_parser, data_path):
         try:
             parsed_output = output_parser.parse(result)
             service_name = parsed_output["service_name"].replace("_service", "")  # Remove _service suffix if present
@@ -0,0 +1,107 @@
+import hashlib
+import os
+import re
+import numpy as np
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+
+# Words every service description and query shares ("a service that provides ... based on ..."),
+# left in they dominate bag-of-words similarity and make unrelated services look alike
+STOPWORDS = set("""
+a an the and or of to in on at for with by from about into over under is are be been being it its this that
+these those as if than then so such service services provide provides providing return returns returning
+should must accept accepts based including include includes using use user users get gets show me my i you
+your we our can will would could what which who how where when there their them they information info data
+different optional all any some each per also given
+""".split())
+
+
+class HashingEmbeddings:
+    """
+    Offline bag-of-words embeddings, used when no embedding API is configured.
+    Similarity only reflects shared content words, not meaning.
+    """
+
+    def __init__(self, dimensions=4096):
+        self.dimensions = dimensions
+        # Named after the tokenization too, so vectors stored by the older variant are re-embedded
+        self.model = f"hashing-content-{dimensions}"
+
+    def _embed(self, text):
+        vector = np.zeros(self.dimensions)
+        for token in re.findall(r"[a-z0-9]+", text.lower()):
+            if len(token) < 2 or token in STOPWORDS:
+                continue
+            bucket = int(hashlib.md5(token.encode("utf-8")).hexdigest(), 16) % self.dimensions
+            vector[bucket] += 1.0
+        return vector.tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def get_embeddings():
+    provider = os.getenv("EMBEDDING_PROVIDER", "openai" if os.getenv("OPENAI_API_KEY") else "hashing")
+    if provider == "openai":
+        from langchain_openai import OpenAIEmbeddings
+
+        return OpenAIEmbeddings(model=EMBEDDING_MODEL)
+    print(
+        "Warning: using offline hashing embeddings, service similarity only reflects shared words. "
+        "Set OPENAI_API_KEY or EMBEDDING_PROVIDER=openai for semantic matching"
+    )
+    return HashingEmbeddings()
+
+
+class ServiceIndex:
+    """
+    In-memory vector index over service descriptions.
+    Vectors are L2-normalized when added, so cosine similarity is a single matrix-vector product.
+    """
+
+    def __init__(self, embeddings=None):
+        self.embeddings = embeddings or get_embeddings()
+        # Stored embeddings are only reused when they came from the same model
+        self.model_name = getattr(self.embeddings, "model", type(self.embeddings).__name__)
+        self.vectors = None
+        self.positions = []
+
+    def embed(self, text):
+        return self.embeddings.embed_query(text)
+
+    def add(self, position, description, vector=None):
+        """
+        Index a service description.
+
+        :param position: Index of the service in ServiceManager.services
+        :param description: Service description to embed
+        :param vector: Precomputed embedding, skips the embedding call
+        :return: The embedding that was indexed
+        """
+        if vector is None:
+            vector = self.embed(description)
+        row = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(row)
+        row = row / norm if norm else row
+        if position in self.positions:
+            # Re-indexing a replaced service
+            self.vectors[self.positions.index(position)] = row
+        else:
+            self.vectors = row[None, :] if self.vectors is None else np.vstack([self.vectors, row])
+            self.positions.append(position)
+        return vector
+
+    def search(self, query, k=5):
+        """Return up to k (service position, cosine similarity) pairs, most similar first"""
+        if self.vectors is None:
+            return []
+        query_vector = np.asarray(self.embed(query), dtype=np.float32)
+        norm = np.linalg.norm(query_vector)
+        if not norm:
+            return []
+        scores = self.vectors @ (query_vector / norm)
+        top = np.argsort(-scores)[:k]
+        return [(self.positions[i], float(scores[i])) for i in top]
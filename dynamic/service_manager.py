@@ -1,6 +1,18 @@
+import json
+import os
+from service_catalog import ServiceCatalog
+from service_index import ServiceIndex
+
+# Registry read by app/utils/data_access.py, the data access library generated services use
+DATA_SOURCES_PATH = os.getenv("DATA_SOURCES_PATH", "data/data_sources.json")
+
+
 class ServiceManager:
-    def __init__(self):
-        self.services = []
+    def __init__(self, catalog=None):
+        self.catalog = catalog or ServiceCatalog()
+        self.index = ServiceIndex()
+        self._services = None
+        self._service_positions = {}
         self.json_data_sources = [
             {
                 "name": "historic_data",
@@ -163,29 +175,93 @@ class ServiceManager:
             }
         ]
 
+        self._data_sources_by_name = {source["name"]: source for source in self.json_data_sources}
+        self.export_data_sources()
+
+    @property
+    def services(self):
+        # The catalog is read on first use, not at startup
+        if self._services is None:
+            self._load_catalog()
+        return self._services
+
+    def _load_catalog(self):
+        self._services = []
+        reembedded = 0
+        for service_info, embedding, embedding_model in self.catalog.load():
+            position = len(self._services)
+            self._services.append(service_info)
+            self._service_positions[service_info["service_name"]] = position
+            if embedding is None or embedding_model != self.index.model_name:
+                # Written with another embedding model, refresh it so the catalog stays consistent
+                embedding = self.index.add(position, service_info["service_description"])
+                self.catalog.upsert(service_info, embedding, self.index.model_name)
+                reembedded += 1
+            else:
+                self.index.add(position, service_info["service_description"], vector=embedding)
+        print(f"Loaded {len(self._services)} services from {self.catalog.path} ({reembedded} re-embedded)")
+
     def add_service(self, service_info):
-        self.services.append(service_info)
+        """Add a service, replacing any catalogued service with the same name"""
+        services = self.services
+        name = service_info["service_name"]
+        position = self._service_positions.get(name)
+        if position is None:
+            position = len(services)
+            services.append(service_info)
+            self._service_positions[name] = position
+        else:
+            services[position] = service_info
+        embedding = self.index.add(position, service_info["service_description"])
+        self.catalog.upsert(service_info, embedding, self.index.model_name)
+
+    def get_service_by_name(self, name):
+        services = self.services
+        position = self._service_positions.get(name)
+        return services[position] if position is not None else None
+
+    def get_service_by_code_hash(self, code_hash):
+        return self.catalog.find_by_code_hash(code_hash)
 
     def get_services_descriptions(self):
         return [service["service_description"] for service in self.services]
 
+    def find_similar_services(self, query, k=5):
+        """Return up to k (service, cosine similarity) pairs for the query, most similar first"""
+        return [(self.services[position], score) for position, score in self.index.search(query, k)]
+
     def get_json_data_sources(self):
         return self.json_data_sources
 
     def get_data_source_by_name(self, name):
-        for source in self.json_data_sources:
-            if source["name"] == name:
-                return source
-        return None
+        return self._data_sources_by_name.get(name)
+
+    def export_data_sources(self, path=DATA_SOURCES_PATH):
+        """Write the data source schemas for get_data_source, only when they changed"""
+        content = json.dumps(self.json_data_sources, indent=2)
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                if f.read() == content:
+                    return
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
 
     def add_json_data_source(self, data_source_info):
         if "description" not in data_source_info or "schema" not in data_source_info:
             raise ValueError("Data source info must include description and schema")
         self.json_data_sources.append(data_source_info)
+        self._data_sources_by_name[data_source_info["name"]] = data_source_info
+        self.export_data_sources()
 
     def update_data_source_description(self, name, new_description):
         source = self.get_data_source_by_name(name)
         if source:
             source["description"] = new_description
+            self.export_data_sources()
             return True
         return False
\ No newline at end of file
@@ -0,0 +1,176 @@
+import ast
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+VALIDATION_TIMEOUT = float(os.getenv("SERVICE_VALIDATION_TIMEOUT", "20"))
+
+# Runs in a separate interpreter: imports the generated module, builds the service without
+# registering it in services.toml, and sends one synthetic request to its POST route.
+SMOKE_TEST_HARNESS = r'''
+import importlib.util
+import json
+import sys
+
+result = {"ok": False, "errors": []}
+try:
+    import app.microservices.base as base
+    # Keep the smoke test from registering ports or touching services.toml
+    base.get_service_port = lambda name: 0
+    base.update_service_info = lambda *args, **kwargs: None
+
+    spec = importlib.util.spec_from_file_location("generated_service", sys.argv[1])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    service_class = next(
+        obj for obj in vars(module).values()
+        if isinstance(obj, type) and issubclass(obj, base.MicroserviceBase) and obj is not base.MicroserviceBase
+    )
+    service = service_class()
+    service.register_routes()
+
+    from fastapi.testclient import TestClient
+
+    client = TestClient(service.app)
+    openapi = client.get("/openapi.json").json()
+    schemas = openapi.get("components", {}).get("schemas", {})
+    post_paths = [path for path, ops in openapi.get("paths", {}).items() if "post" in ops]
+    if not post_paths:
+        raise ValueError("The service does not register a POST route")
+
+    samples = {"string": "test", "integer": 1, "number": 1.0, "boolean": True}
+
+    def sample_value(schema):
+        if "$ref" in schema:
+            return sample_body(schemas[schema["$ref"].split("/")[-1]])
+        options = [s for s in schema.get("anyOf", []) if s.get("type") != "null"]
+        if options:
+            return sample_value(options[0])
+        if schema.get("type") == "array":
+            return [sample_value(schema.get("items", {}))]
+        if schema.get("type") == "object":
+            return sample_body(schema)
+        return samples.get(schema.get("type"), "test")
+
+    def sample_body(schema):
+        # Only required fields, optional ones exercise the service's defaults
+        properties = schema.get("properties", {})
+        return {name: sample_value(properties[name]) for name in schema.get("required", [])}
+
+    path = post_paths[0]
+    operation = openapi["paths"][path]["post"]
+    body_schema = (
+        operation.get("requestBody", {})
+        .get("content", {}).get("application/json", {}).get("schema", {})
+    )
+    body = sample_value(body_schema) if body_schema else {}
+
+    # Services that take plain function arguments receive them as query or path parameters
+    query = {}
+    url = path
+    for parameter in operation.get("parameters", []):
+        if not parameter.get("required"):
+            continue
+        value = sample_value(parameter.get("schema", {}))
+        if parameter.get("in") == "query":
+            query[parameter["name"]] = value
+        elif parameter.get("in") == "path":
+            url = url.replace("{" + parameter["name"] + "}", str(value))
+
+    request = {"body": body, "query": query}
+    response = client.post(url, json=body, params=query)
+    if response.status_code >= 500:
+        raise ValueError(f"Synthetic request {request} to {url} failed with {response.status_code}: {response.text[:500]}")
+    if response.status_code == 422:
+        raise ValueError(f"Synthetic request {request} built from the schema was rejected: {response.text[:500]}")
+    result["ok"] = True
+except StopIteration:
+    result["errors"].append("No MicroserviceBase subclass found after import")
+except Exception as e:
+    result["errors"].append(f"{type(e).__name__}: {e}")
+print(json.dumps(result))
+'''
+
+
+def check_structure(code):
+    """
+    Static checks on generated service code.
+
+    :param code: Python source of the generated service
+    :return: List of problems found, empty if the code looks like a valid service
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return [f"SyntaxError at line {e.lineno}: {e.msg}"]
+
+    errors = []
+    service_classes = [
+        node for node in tree.body
+        if isinstance(node, ast.ClassDef)
+        and any(isinstance(b, ast.Name) and b.id == "MicroserviceBase" for b in node.bases)
+    ]
+    if not service_classes:
+        errors.append("No class inheriting from MicroserviceBase")
+    else:
+        methods = {item.name for item in service_classes[0].body if isinstance(item, ast.FunctionDef)}
+        for required in ("__init__", "register_routes"):
+            if required not in methods:
+                errors.append(f"{service_classes[0].name} does not define {required}")
+
+    if not any(isinstance(node, ast.FunctionDef) and node.name.startswith("start_") for node in tree.body):
+        errors.append("No module-level start_* function")
+
+    imports_base = any(
+        isinstance(node, ast.ImportFrom) and node.module == "app.microservices.base"
+        for node in ast.walk(tree)
+    )
+    if not imports_base:
+        errors.append("MicroserviceBase must be imported from app.microservices.base")
+    return errors
+
+
+def smoke_test(code, timeout=None):
+    """Import the service and send it one synthetic request in a subprocess with a time limit"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        service_file = os.path.join(tmp_dir, "service.py")
+        with open(service_file, "w") as f:
+            f.write(code)
+
+        # Run from the project root so app.* imports and data/ paths resolve as they do in production
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.getenv("PYTHONPATH")])))
+        try:
+            completed = subprocess.run(
+                [sys.executable, "-c", SMOKE_TEST_HARNESS, service_file],
+                capture_output=True,
+                text=True,
+                timeout=timeout or VALIDATION_TIMEOUT,
+                env=env,
+            )
+        except subprocess.TimeoutExpired:
+            return [f"Import smoke test did not finish within {timeout or VALIDATION_TIMEOUT}s"]
+
+    lines = completed.stdout.strip().splitlines()
+    try:
+        result = json.loads(lines[-1])
+    except (IndexError, json.JSONDecodeError):
+        return [f"Smoke test crashed: {completed.stderr.strip()[-1000:]}"]
+    return result["errors"]
+
+
+def validate_service_code(code, timeout=None):
+    """
+    Validate generated service code before it is written to disk.
+
+    :param code: Python source of the generated service
+    :param timeout: Time limit in seconds for the subprocess smoke test
+    :return: List of problems found, empty if the service passed every check
+    """
+    errors = check_structure(code)
+    if errors:
+        # The smoke test would only fail on the same problems, more slowly
+        return errors
+    return smoke_test(code, timeout)
@@ -0,0 +1,59 @@
+import os
+import sys
+
+from fastapi.testclient import TestClient
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.microservices import base  # noqa: E402
+from app.utils.param_adapters import compile_adapter, find_post_route, request_fields  # noqa: E402
+
+
+def build_service(monkeypatch, module):
+    """Instantiate a service without registering it in services.toml"""
+    monkeypatch.chdir(ROOT)
+    monkeypatch.setattr(base, "get_service_port", lambda name: 0)
+    monkeypatch.setattr(base, "update_service_info", lambda *args, **kwargs: None)
+    service = module.AirQualityService()
+    service.register_routes()
+    return service
+
+
+def adapt(service, params):
+    openapi = service.app.openapi()
+    path = find_post_route(openapi, "air_quality")
+    return compile_adapter(path, request_fields(openapi, path))(params)
+
+
+def test_array_body_and_query_parameter(monkeypatch):
+    from app.generated_services.air_quality import service as module
+
+    service = build_service(monkeypatch, module)
+    request, errors = adapt(service, {"Locations": "Gachibowli", "timestamp": "2024-06-01T12:00:00"})
+
+    assert errors == []
+    assert request == {"path": "/air_quality/", "query": {"timestamp": "2024-06-01T12:00:00"}, "body": ["Gachibowli"]}
+    response = TestClient(service.app).post(request["path"], json=request["body"], params=request["query"])
+    assert response.status_code != 422
+
+
+def test_missing_array_body_is_reported(monkeypatch):
+    from app.generated_services.air_quality import service as module
+
+    request, errors = adapt(build_service(monkeypatch, module), {"timestamp": "2024-06-01"})
+    assert request["body"] is None
+    assert errors == ["Missing required parameters: locations"]
+
+
+def test_model_body(monkeypatch):
+    from app.microservices.air_quality import service as module
+
+    service = build_service(monkeypatch, module)
+    request, errors = adapt(service, {"location": ["Gachibowli", "Madhapur"]})
+
+    assert errors == []
+    assert request["path"] == "/air_quality"
+    assert request["body"]["location"] == ["Gachibowli", "Madhapur"]
+    response = TestClient(service.app).post(request["path"], json=request["body"], params=request["query"])
+    assert response.status_code != 422
@@ -0,0 +1,44 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "dynamic"))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("OPENAI_MODEL", "gpt-4o-mini")
+
+from query_refiner import QueryRefiner  # noqa: E402
+from service_index import HashingEmbeddings, ServiceIndex  # noqa: E402
+
+SERVICE_DESCRIPTIONS = [
+    "A service that provides real-time and historical air quality measurements including AQI, PM2.5 and PM10 "
+    "levels for different locations",
+    "A service that recommends restaurants based on location, cuisine type, price range and dietary restrictions",
+    "A service that monitors water quality metrics such as pH and turbidity in lakes at different locations",
+]
+
+
+class IndexedServices:
+    """Minimal service manager over an offline hashing index"""
+
+    def __init__(self, descriptions):
+        self.index = ServiceIndex(HashingEmbeddings())
+        self.services = []
+        for position, description in enumerate(descriptions):
+            self.services.append({"service_name": f"service_{position}", "service_description": description})
+            self.index.add(position, description)
+
+    def find_similar_services(self, query, k=5):
+        return [(self.services[position], score) for position, score in self.index.search(query, k)]
+
+
+def test_unrelated_query_has_no_match_with_hashing_embeddings():
+    refiner = QueryRefiner(IndexedServices(SERVICE_DESCRIPTIONS))
+    # Shares only boilerplate words with the catalogued services, the LLM is never asked
+    assert refiner._shortlist_services("A service that generates a random password") == ([], None)
+
+
+def test_related_query_is_shortlisted_with_hashing_embeddings():
+    refiner = QueryRefiner(IndexedServices(SERVICE_DESCRIPTIONS))
+    candidates, matched = refiner._shortlist_services("Water quality of the lake for swimming")
+    assert matched is None
+    assert candidates[0][0]["service_name"] == "service_2"
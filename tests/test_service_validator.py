@@ -0,0 +1,39 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "dynamic"))
+
+from service_validator import validate_service_code  # noqa: E402
+
+QUERY_PARAM_SERVICE = '''
+from typing import Optional
+from app.microservices.base import MicroserviceBase
+
+
+class LookupService(MicroserviceBase):
+    def __init__(self):
+        super().__init__("lookup")
+
+    def register_routes(self):
+        @self.app.post("/lookup")
+        async def lookup(location: str, limit: int, note: Optional[str] = None):
+            return {"location": location, "limit": limit}
+
+
+def start_lookup_service():
+    service = LookupService()
+    service.run()
+'''
+
+
+def test_validate_query_param_service(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    assert validate_service_code(QUERY_PARAM_SERVICE) == []
+
+
+def test_validate_rejects_failing_service(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    code = QUERY_PARAM_SERVICE.replace('return {"location": location, "limit": limit}', "return 1 / 0")
+    errors = validate_service_code(code)
+    assert errors